@@ -14,13 +14,14 @@
 #       the original program.
 #
 #
-from lib import util, pass1, pass2
+from lib import util, assembler, linker, source
 
 __author__ = 'Nicholas Pickering'
 
-import sys
-import datetime
+import argparse
 import os
+import sys
+import time
 
 location = 0
 filename = ''
@@ -30,159 +31,154 @@ generate_obj = False
 print("SIC/XE Assembler 3000")
 print("Written by Nicholas Pickering")
 
-#   Read in file for processing...
-if len(sys.argv) > 1:
-    filename = sys.argv[1]
+#   Read in options and file for processing...
+parser = argparse.ArgumentParser(description="SIC/XE Assembler 3000")
+parser.add_argument("filename", nargs="?", help="file containing a SIC/XE program")
+parser.add_argument("-O", "--optimize", action="store_true",
+                    help="choose format 3 or 4 automatically, widening to format 4 only when out of range")
+parser.add_argument("--obj-only", action="store_true",
+                    help="skip the lst file, writing only the obj file, or an err file listing errors on failure")
+parser.add_argument("--spill", action="store_true",
+                    help="keep records between passes in temporary files rather than memory, cannot be used with -O")
+parser.add_argument("--json", action="store_true",
+                    help="write the listing as a json file, one object per line, rather than an lst file")
+parser.add_argument("--symbols-db", default=None, metavar="FILE",
+                    help="keep the symbol table in an SQLite database on disk rather than memory, left for other tools")
+parser.add_argument("-w", "--watch", action="store_true",
+                    help="keep running, reassembling the program whenever it, or a file it includes, is saved")
+options = parser.parse_args()
+
+if options.spill and options.optimize:
+    parser.error("--spill cannot be used with -O")
+if options.json and options.obj_only:
+    parser.error("--json cannot be used with --obj-only")
+if options.json and options.watch:
+    parser.error("--json cannot be used with -w")
+
+if options.filename:
+    filename = options.filename
 else:
     util.error("No filename specified... Exiting...", True)
 
-file = open(filename, "r")
-if not file:
+if not os.path.isfile(filename):
     util.error("File could not be loaded... Exiting...", True)
 
 #
-#   Start Pass 1
-#   Generate Memory Locations for input program
+#   Open Symbol Database
+#   The symbol table is kept on disk, rather than in memory, when a database is given
+#
+database = None
+if options.symbols_db is not None:
+    from lib import symbol_database, symbol_table
+    import sqlite3
+    try:
+        database = symbol_database.SymbolDatabase(options.symbols_db)
+    except sqlite3.Error as e:
+        util.error("Could not open " + options.symbols_db + ": " + str(e) + "... Exiting...", True)
+    symbol_table.use_backend(database)
+
+#
+#   Watch Program
+#   Reassemble the program in this process whenever it changes, until interrupted
 #
-pass1_result = pass1.process(file)
-lst = pass1_result['lst']
+if options.watch:
+    from lib import build, watch
+
+    def rebuild(filenames):
+        started = time.perf_counter()
+        results = build.build_here(filenames, options.optimize, not options.obj_only, options.spill)
+        elapsed = time.perf_counter() - started
+
+        status = "assembled" if all(result['success'] for result in results) else "failed"
+        print(time.strftime("%H:%M:%S") + " " + status + " in " + "%.1f" % (elapsed * 1000) + " ms")
+        for line in build.report(results, elapsed)[4:]:
+            print(line)
+        return results
+
+    print("Watching " + filename + " for changes, press Ctrl-C to stop...")
+    try:
+        watch.watch([filename], rebuild)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    sys.exit(0)
 
-if pass1_result['success'] is False:
-    print("Errors (pass 1): No object code generated. Refer to "+filename+".lst.")
+#
+#   Assemble Program
+#   Generate Memory Locations, then Object Code, for input program
+#
+listing = not options.obj_only
+with open(filename, "r") as file:
+    result = assembler.assemble(source.read_lines(file), options.optimize, listing, filename, options.spill)
+lst = result['lst']
+
+# without a listing, errors are reported in the err file
+report_filename = filename+".lst" if listing else filename+".err"
+if options.json:
+    report_filename = filename+".json"
+
+if result['pass'] == 1:
+    print("Errors (pass 1): No object code generated. Refer to "+report_filename+".")
+elif result['success'] is False:
+    print("Errors (pass 2): partial object code generation, but no object file instantiation. Refer to "+report_filename+".")
 else:
+
     #
-    #   Start Pass 2
-    #   Generate Object Code for input program, only if Pass 1 is successful
+    #   Assembly Successful
+    #   Pass 1 and 2 completed successfully, allow for generation of obj file
     #
-    pass2_result = pass2.process(pass1_result['lst'])
-    lst = pass2_result['lst']
-
-    if pass2_result['success'] is False:
-        print("Errors (pass 2): partial object code generation, but no object file instantiation. Refer to "+filename+".lst.")
-    else:
-
-        #
-        #   Assembly Successful
-        #   Pass 1 and 2 completed successfully, allow for generation of obj file
-        #
-        generate_obj = True
-        print("Assembly report file: "+filename+".lst")
-        print("         object file: "+filename+".obj")
+    generate_obj = True
+    if listing:
+        print("Assembly report file: "+report_filename)
+    print("         object file: "+filename+".obj")
+    print("           link file: "+filename+".lnk")
 
 
 #
 #   Write lst File
-#   Compile each of the lst line items into a file
-#
-lst_filename = filename+".lst"
-
-if os.path.exists(lst_filename):  # remove file if exists
-    os.remove(lst_filename)
-
-with open(lst_filename, "w") as lst_file:
-    lst_file.write("******************************************************" + "\n")
-    lst_file.write("SIC/XE Assembler 3000" + "\n")
-    lst_file.write("Written by Nicholas Pickering" + "\n")
-    lst_file.write("Generated: " + datetime.datetime.now().__format__('%a %b %d %H:%M:%S %Y') + "\n")
-    lst_file.write("******************************************************" + "\n")
-    lst_file.write("ASSEMBLER REPORT" + "\n")
-    lst_file.write("----------------" + "\n")
-    lst_file.write("    \tLocation\tObject Code\t\tSource Code" + "\n")
-    lst_file.write("    \t--------\t-----------\t\t-----------" + "\n")
-    for lst_item in lst:
-        if 'Error' not in lst_item:
-            lst_file.write(lst_item['Line ID'] + "\t\t" + lst_item['Location'].ljust(5) +
-                           "\t\t" + lst_item['Object Code'].ljust(8) + "\t\t" + lst_item['Source'] + "\n")
-        else:
-            lst_file.write("******************* ERROR: " + lst_item['Error'] + "\n")
+#   Compile each of the lst line items into a file, or a json file for other tools to read
+#
+if options.json:
+    with open(filename+".json", "w") as json_file:
+        assembler.write_json(json_file, lst)
+elif listing:
+    with open(filename+".lst", "w") as lst_file:
+        assembler.write_lst(lst_file, lst)
+
+#
+#   Write err File
+#   Without a listing, errors are only written when assembly fails, and old errors are removed when it succeeds
+#
+elif not generate_obj:
+    with open(filename+".err", "w") as err_file:
+        assembler.write_errors(err_file, lst)
+elif os.path.exists(filename+".err"):
+    os.remove(filename+".err")
 
 #
 #   Write obj File
 #   If assembly completed successfully, compile obj file from lst line items
 #
 if generate_obj:
-    obj_filename = filename+".obj"
-
-    if os.path.exists(obj_filename):  # remove file if exists
-        os.remove(obj_filename)
-
-    with open(obj_filename, "w") as obj_file:
-
-        #
-        #   Calculate number of reservations
-        #   In order to generate our obj file correctly, we need to determine how many reserved sections are
-        #       required in the final result
-        #
-        #   Reserved sections are determined by the use of the RESW or RESB operations
-        #
-
-        start_address = None
-        current_address = None
-        res_count = 0
-        res_total = 1
-        for i, lst_item in enumerate(lst):
-            mneumonic = None
-            meta = lst_item.get('Meta', None)
-            if meta:
-                mneumonic = meta.get('mneumonic', None)
-
-            if mneumonic in ['RESW', 'RESB']:
-                res_total += 1
-
-        #
-        #   Generate obj file
-        #   Parse the lst line items, writing object code and reserved sections in as necessary
-        #
-        #   Reserved sections are denoted using a bang(!)
-        #
-        for i, lst_item in enumerate(lst):
-            if 'Error' not in lst_item:
-
-                # evaluate the item after the current item in the lst
-                # necessary to determine program counter value
-                next_item = None
-                if i+1 is not len(lst):
-                    next_item = lst[i+1]
-
-                mneumonic = None
-                meta = lst_item.get('Meta', None)
-                if meta:
-                    mneumonic = meta.get('mneumonic', None)
-
-                #
-                # Process Reserved Section Header
-                #
-                # Reserved sections consist of a header and a body, essentially
-                # The header consists of the memory location in which the string of object codes should
-                #   be written.
-                #
-                if mneumonic in ['RESW', 'RESB'] or current_address is None:
-                    res_count += 1
-
-                    if mneumonic in ['RESW', 'RESB']:
-                        obj_file.write("!" + "\n")
-
-                    if next_item is not None:
-                        current_address = next_item['Location']
-
-                    if start_address is None:
-                        start_address = current_address
-
-                    obj_file.write(current_address.zfill(6) + "\n")
-                    if res_count == res_total:
-                        obj_file.write(start_address.zfill(6) + "\n")
-                    else:
-                        obj_file.write("000000".zfill(6) + "\n")
-
-                #
-                # Process Reserved Section Body record
-                #
-                # The body consists of any assembled object codes until the next reserved section or the end of the
-                #   program.
-                #
-                # Object Code generated during Pass 2 is written to file as-is
-                #
-                elif len(lst_item['Object Code']) > 0:
-                    obj_file.write(lst_item['Object Code'] + "\n")
-
-        obj_file.write("!" + "\n")
+    with open(filename+".obj", "w") as obj_file:
+        assembler.write_obj(obj_file, lst)
+
+    #
+    #   Write lnk File
+    #   Link information lets the linker combine this obj file with others assembled separately
+    #
+    with open(filename+".lnk", "w") as lnk_file:
+        linker.write_link_info(lnk_file, result['link'], os.path.splitext(os.path.basename(filename))[0])
+
+#
+#   Close Spilled Records
+#   Once every file is written, the temporary files holding the lst record are removed
+#
+if options.spill:
+    lst.close()
+
+#
+#   Close Symbol Database
+#   The symbols of the program are left in the database for other tools
+#
+if database is not None:
+    database.close()
@@ -0,0 +1,91 @@
+#
+#
+#   Build
+#   This module acts as the starting point for assembling many programs at once
+#
+#   Each program is assembled exactly as assemble.py would, writing its lst, obj and lnk files next to its source.
+#   Sources are read ahead, programs are assembled in parallel by worker processes, and files are written while
+#       other programs are assembled. A single report is printed once every program is finished.
+#
+#
+from lib import build, watch
+
+__author__ = 'Nicholas Pickering'
+
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import sys
+import time
+
+
+#
+#   Main Function
+#   Reads the options, then builds every program
+#
+#   Worker processes may import this module again to run the build (the spawn and forkserver start methods), so
+#       nothing is built unless the module is run as a script.
+#
+def main():
+
+    #   Start Main Program
+    print("SIC/XE Assembler 3000")
+    print("Written by Nicholas Pickering")
+
+    #   Read in options and files for processing...
+    parser = argparse.ArgumentParser(description="SIC/XE Assembler 3000, multiple program build")
+    parser.add_argument("filenames", nargs="+", help="files containing SIC/XE programs")
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="choose format 3 or 4 automatically, widening to format 4 only when out of range")
+    parser.add_argument("--obj-only", action="store_true",
+                        help="skip lst files, writing only obj files, or err files listing errors on failure")
+    parser.add_argument("--spill", action="store_true",
+                        help="keep records between passes in temporary files rather than memory, "
+                             "cannot be used with -O")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of programs to assemble in parallel, defaults to the number of processors")
+    parser.add_argument("-n", "--in-flight", type=int, default=None,
+                        help="number of programs read, assembled or written at once, defaults to twice the jobs")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="keep running, reassembling each program whenever it, or a file it includes, is saved")
+    options = parser.parse_args()
+
+    if options.spill and options.optimize:
+        parser.error("--spill cannot be used with -O")
+
+    jobs = max(1, options.jobs)
+    in_flight = options.in_flight or jobs * 2
+
+    #
+    #   Build Programs
+    #   When watching, the worker processes stay running between builds, and only programs which changed are rebuilt
+    #
+    def rebuild(filenames):
+        started = time.perf_counter()
+        results = asyncio.run(build.build(filenames, executor, options.optimize, in_flight, io_executor,
+                                          not options.obj_only, options.spill))
+        elapsed = time.perf_counter() - started
+
+        for line in build.report(results, elapsed):
+            print(line)
+        return results
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor, \
+            concurrent.futures.ThreadPoolExecutor(in_flight * 3) as io_executor:
+        if options.watch:
+            print("Watching " + str(len(options.filenames)) + " programs for changes, press Ctrl-C to stop...")
+            try:
+                watch.watch(options.filenames, rebuild)
+            except KeyboardInterrupt:
+                print("Stopped watching.")
+            sys.exit(0)
+
+        results = rebuild(options.filenames)
+
+    if not all(result['success'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#
+#
+#   Check Startup
+#   This module checks how long the assembler takes to import everything it needs to assemble a short program
+#
+#   A short assemble is dominated by fixed costs, mostly importing modules. The assembler is run a few times under
+#       python -X importtime on a small program, and the time spent importing modules is totalled, leaving out
+#       what the interpreter imports before running any script (site, encodings and the like).
+#
+#   The check fails if the median total is over budget, listing the most expensive imports, so a new import at the
+#       top of a module is caught before it slows down every assemble.
+#
+#
+from lib import util
+
+__author__ = 'Nicholas Pickering'
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# time, in milliseconds, the assembler may spend importing modules
+BUDGET = 30.0
+
+# program assembled when checking, as in the README
+PROGRAM = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "test3.txt")
+
+
+#
+#   Import Times Function
+#   runs python -X importtime with the given arguments, returning the cumulative time of each module imported
+#       at the top level, in microseconds, by module name
+#
+def import_times(arguments, directory):
+    environment = dict(os.environ)
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    process = subprocess.run([sys.executable, "-X", "importtime"] + arguments, cwd=directory, env=environment,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        name = fields[2][1:].rstrip()
+        if not name.startswith(" "):
+            times[name] = times.get(name, 0) + int(fields[1])
+    return times
+
+
+#   Start Main Program
+print("SIC/XE Startup Check 3000")
+print("Written by Nicholas Pickering")
+
+#   Read in options...
+parser = argparse.ArgumentParser(description="SIC/XE Startup Check 3000")
+parser.add_argument("entry", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             "assemble.py"),
+                    help="assembler to check, assemble.py or a zipapp built by make zipapp")
+parser.add_argument("-b", "--budget", type=float, default=BUDGET,
+                    help="milliseconds the assembler may spend importing modules, defaults to " + str(BUDGET))
+parser.add_argument("-n", "--runs", type=int, default=7, help="number of runs, the median is checked")
+options = parser.parse_args()
+
+if not os.path.isfile(options.entry):
+    util.error("Could not find " + options.entry + "... Exiting...", True)
+
+#
+#   Measure Imports
+#   The program is copied to a temporary directory, so the files written by the assembler are thrown away
+#
+with tempfile.TemporaryDirectory() as directory:
+    program = os.path.join(directory, "program.txt")
+    shutil.copyfile(PROGRAM, program)
+
+    interpreter = import_times(["-c", "pass"], directory)
+
+    # the first run writes any missing bytecode, and is not counted
+    import_times([os.path.abspath(options.entry), program], directory)
+
+    totals = []
+    for run in range(options.runs):
+        times = import_times([os.path.abspath(options.entry), program], directory)
+        for name in interpreter:
+            times.pop(name, None)
+        totals.append((sum(times.values()), times))
+
+totals.sort(key=lambda total: total[0])
+median, times = totals[len(totals) // 2]
+
+print("Imports took " + "%.1f" % (median / 1000) + " ms of a " + "%.1f" % options.budget + " ms budget")
+
+if median > options.budget * 1000:
+    for name, time in sorted(times.items(), key=lambda item: -item[1])[:10]:
+        print("%8.1f ms  %s" % (time / 1000, name))
+    util.error("Startup is over budget", True)
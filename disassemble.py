@@ -0,0 +1,116 @@
+#
+#
+#   Disassemble
+#   This module acts as the starting point for the disassembler
+#
+#   The disassembler reads an obj file written by the assembler, or the linker, and decodes each of its records
+#       back into an operation, with its addressing method and the memory location it refers to.
+#
+#   With --verify, every record is checked against the line of source assembled at its location, read from the
+#       lst or json file written along with the obj file. The disassembler exits with an error if any record does
+#       not match its line.
+#
+#
+from lib import util, disassembler
+
+__author__ = 'Nicholas Pickering'
+
+import argparse
+import os
+import sys
+import time
+
+#   Start Main Program
+print("SIC/XE Disassembler 3000")
+print("Written by Nicholas Pickering")
+
+#   Read in options and file for processing...
+parser = argparse.ArgumentParser(description="SIC/XE Disassembler 3000")
+parser.add_argument("filename", help="obj file written by the assembler or the linker")
+parser.add_argument("-o", "--output", default=None, help="file to write the disassembly to, defaults to the screen")
+parser.add_argument("-b", "--base", default=None, help="base address, in hex, in effect at the start of the program")
+parser.add_argument("--verify", action="store_true",
+                    help="check every record against the line assembled at its location, from the lst or json file")
+parser.add_argument("-l", "--listing", default=None,
+                    help="lst or json file to verify against, defaults to the one written along with the obj file")
+parser.add_argument("-q", "--quiet", action="store_true", help="skip the disassembly, only report the summary")
+options = parser.parse_args()
+
+base_address = int(options.base, 16) if options.base is not None else None
+
+try:
+    obj_file = open(options.filename, "r")
+except IOError as e:
+    util.error("Could not load " + options.filename + ": " + str(e) + "... Exiting...", True)
+
+#
+#   Read Listing
+#   The lines assembled into the obj file, found next to it unless given
+#
+listing = None
+if options.verify:
+    listing_filename = options.listing
+    if listing_filename is None:
+        stem = options.filename[:-len(".obj")] if options.filename.endswith(".obj") else options.filename
+        for extension in [".lst", ".json"]:
+            if os.path.isfile(stem + extension):
+                listing_filename = stem + extension
+                break
+        else:
+            util.error("--verify needs the lst or json file of " + options.filename + ", give it with -l... Exiting...",
+                       True)
+
+    try:
+        with open(listing_filename, "r") as listing_file:
+            listing = disassembler.read_listing(listing_file)
+    except (IOError, ValueError) as e:
+        util.error("Could not read " + listing_filename + ": " + str(e) + "... Exiting...", True)
+
+output_file = sys.stdout
+if options.output is not None:
+    output_file = open(options.output, "w")
+
+#
+#   Disassemble Program
+#   Records are decoded and written as the obj file is read
+#
+records = 0
+operations = 0
+failed = []
+start_address = 0
+
+started = time.perf_counter()
+with obj_file:
+    try:
+        for instruction in disassembler.disassemble(obj_file, base_address):
+            if 'section' in instruction:
+                start_address = instruction['start']
+            else:
+                records += 1
+                if instruction['decoded'] is not None:
+                    operations += 1
+                if options.verify:
+                    problems = disassembler.verify(instruction, listing['lines'].get(instruction['location'], None),
+                                                   listing['symbols'])
+                    if len(problems) > 0:
+                        failed.append((instruction, problems))
+
+            if not options.quiet:
+                output_file.write(disassembler.format_instruction(instruction) + "\n")
+    except ValueError as e:
+        util.error("Could not read " + options.filename + ": " + str(e) + "... Exiting...", True)
+elapsed = time.perf_counter() - started
+
+if options.output is not None:
+    output_file.close()
+
+print("START " + hex(start_address)[2:].upper().zfill(5))
+print(str(records) + " records, " + str(operations) + " operations, " + str(records - operations) + " data, in " +
+      "%.3f" % elapsed + " seconds")
+
+if options.verify:
+    for instruction, problems in failed:
+        print("Verify failed: " + disassembler.format_instruction(instruction) + ": " + ", ".join(problems))
+    print("Verified " + str(records - len(failed)) + " of " + str(records) + " records against " + listing_filename)
+    if len(failed) > 0:
+        sys.exit(1)
@@ -0,0 +1,322 @@
+#
+#
+#   Assembler
+#   This module runs both passes over a SIC/XE program and writes the resulting lst and obj files
+#
+#   The assembler entry points (assemble.py, build.py) read programs and decide where the files are written,
+#       this module does the work between.
+#
+#   The spill module is only imported when records are spilled, to keep a short assemble quick to start.
+#
+#
+
+from lib import pass1, pass2, symbol_table
+
+import time
+
+
+#
+#   Assemble Function
+#   Runs Pass 1 over a program and, only if Pass 1 is successful, Pass 2
+#
+#   lines - lines of the program, broken up into tokens (see the source module)
+#   optimize - if set, format 3/4 operations are sized automatically (see pass1.process)
+#   listing - if not set, the lst record only keeps what is needed to write the obj and error files
+#   filename - name of the file the lines were read from, files named by COPY are relative to it
+#   spill_records - if set, lst records are kept in temporary files rather than in memory (see the spill module),
+#       and the lst record returned is a Spill, which should be closed once written. Cannot be combined with
+#       optimize, since sizing needs every record at once.
+#
+#   This function may return True or False to denote success and failure, along with the pass which
+#       completed last.
+#
+#   This function also returns the lst record, the files included by the program, and the link information
+#       when Pass 2 is reached.
+#
+def assemble(lines, optimize=False, listing=True, filename=None, spill_records=False):
+    if optimize and spill_records:
+        raise ValueError("Spilled lst records cannot be sized, optimize must not be set")
+
+    if spill_records:
+        from lib import spill
+
+    # every program starts with an empty symbol table
+    symbol_table.clear_symbols()
+
+    #
+    #   Start Pass 1
+    #   Generate Memory Locations for input program
+    #
+    pass1_result = pass1.process_lines(lines, optimize, listing, filename,
+                                       spill.Spill(listing) if spill_records else None)
+    result = {
+        'success': False,
+        'pass': 1,
+        'lst': pass1_result['lst'],
+        'included': pass1_result['included'],
+        'link': None
+    }
+
+    if pass1_result['success'] is False:
+        return result
+
+    #
+    #   Start Pass 2
+    #   Generate Object Code for input program, only if Pass 1 is successful
+    #
+    pass2_result = pass2.process(pass1_result['lst'], spill.Spill(listing) if spill_records else None)
+    if spill_records:
+        pass1_result['lst'].close()
+
+    result['success'] = pass2_result['success']
+    result['pass'] = 2
+    result['lst'] = pass2_result['lst']
+    result['link'] = pass2_result['link']
+
+    return result
+
+
+#
+#   Write lst File Function
+#   Compile each of the lst line items into a file
+#
+#   lst_file - open file to write to
+#   lst - lst record to write
+#
+def write_lst(lst_file, lst):
+    lst_file.write("******************************************************" + "\n")
+    lst_file.write("SIC/XE Assembler 3000" + "\n")
+    lst_file.write("Written by Nicholas Pickering" + "\n")
+    lst_file.write("Generated: " + time.strftime('%a %b %d %H:%M:%S %Y') + "\n")
+    lst_file.write("******************************************************" + "\n")
+    lst_file.write("ASSEMBLER REPORT" + "\n")
+    lst_file.write("----------------" + "\n")
+    lst_file.write("    \tLocation\tObject Code\t\tSource Code" + "\n")
+    lst_file.write("    \t--------\t-----------\t\t-----------" + "\n")
+    for lst_item in lst:
+        if 'Error' not in lst_item:
+            lst_file.write(lst_item['Line ID'] + "\t\t" + lst_item['Location'].ljust(5) +
+                           "\t\t" + lst_item['Object Code'].ljust(8) + "\t\t" + lst_item['Source'] + "\n")
+        else:
+            lst_file.write("******************* ERROR: " + lst_item['Error'] + "\n")
+
+
+#
+#   Write JSON File Function
+#   Writes the lst record as JSON, one object per line (NDJSON), so tools may read a listing a line at a time
+#
+#   json_file - open file to write to
+#   lst - lst record to write, only iterated over once, so it may be streamed (see the spill module)
+#
+#   Each line item is written as an object holding:
+#       type - "line"
+#       line - line id, as in the lst file
+#       location - memory location as an integer, null for lines without one (comments, unsupported operations)
+#       object - object code in hex, null for lines without object code
+#       source - source of the line item
+#       kind - kind of line, as classified by Pass 2 (see pass2.classify)
+#       mneumonic, operand, addressing - as read from the source, for operations
+#       flags - any of "indexed", "extended", "sic", "widened" and "literal"
+#       errors - messages of the errors found for the line item
+#
+#   Errors are attached to the line item with the same line id, which they either directly precede or follow (an
+#       LTORG or END is followed by its literal pool, and errors found in the pool have its line id). Errors which
+#       cannot be attached to a line item are written as objects of type "error", holding the line and error.
+#
+#   The last object written is of type "symbols", holding every symbol and its value, by name.
+#
+def write_json(json_file, lst):
+    import json
+
+    def write(item):
+        json_file.write(json.dumps(item) + "\n")
+
+    # the last line item, along with any literal pool following it, and errors waiting for their line item
+    held = []
+    waiting = []
+    for lst_item in lst:
+        if 'Error' in lst_item:
+            for record in reversed(held):
+                if record['line'] == lst_item['Line ID']:
+                    record['errors'].append(lst_item['Error'])
+                    break
+            else:
+                waiting.append(lst_item)
+            continue
+
+        record = json_record(lst_item)
+        if 'literal' not in record['flags']:
+            for held_record in held:
+                write(held_record)
+            del held[:]
+        held.append(record)
+
+        # errors preceding a line item were found while reading its source, such as duplicate labels
+        for error in waiting:
+            if error['Line ID'] == record['line']:
+                record['errors'].append(error['Error'])
+            else:
+                write({'type': 'error', 'line': error['Line ID'], 'error': error['Error']})
+        del waiting[:]
+
+    for record in held:
+        write(record)
+    for error in waiting:
+        write({'type': 'error', 'line': error['Line ID'], 'error': error['Error']})
+
+    write({'type': 'symbols', 'symbols': dict(sorted(symbol_table.list_symbols()))})
+
+
+#
+#   JSON Record Function
+#   Converts a line item of the lst record to the object written for it by write_json
+#
+def json_record(lst_item):
+    meta = lst_item['Meta']
+
+    # only locations formatted by util.add_lst_record are memory locations
+    location = None
+    try:
+        value = int(lst_item['Location'], 16)
+        if hex(value)[2:].zfill(5).upper() == lst_item['Location']:
+            location = value
+    except ValueError:
+        pass
+
+    flags = [flag for flag in ['indexed', 'extended', 'sic', 'widened'] if meta.get(flag, False)]
+    if meta.get('flag', None) in ['-litch', '-lithx']:
+        flags.append('literal')
+
+    record = {
+        'type': 'line',
+        'line': lst_item['Line ID'],
+        'location': location,
+        'object': lst_item['Object Code'].strip() or None,
+        'source': lst_item.get('Source', None),
+        'kind': meta.get('kind', None)
+    }
+    if 'mneumonic' in meta:
+        record['mneumonic'] = meta['mneumonic']
+        record['operand'] = meta['operand']
+        record['addressing'] = meta['addressing'].strip()
+    record['flags'] = flags
+    record['errors'] = []
+    return record
+
+
+#
+#   Write obj File Function
+#   Compile obj file from lst line items, only valid once assembly completed successfully
+#
+#   obj_file - open file to write to
+#   lst - lst record to write
+#
+def write_obj(obj_file, lst):
+
+    #
+    #   Calculate number of reservations
+    #   In order to generate our obj file correctly, we need to determine how many reserved sections are
+    #       required in the final result
+    #
+    #   Reserved sections are determined by the use of the RESW or RESB operations
+    #
+
+    start_address = None
+    current_address = None
+    res_count = 0
+    res_total = 1
+    for lst_item in lst:
+        mneumonic = None
+        meta = lst_item.get('Meta', None)
+        if meta:
+            mneumonic = meta.get('mneumonic', None)
+
+        if mneumonic in ['RESW', 'RESB']:
+            res_total += 1
+
+    #
+    #   Generate obj file
+    #   Parse the lst line items, writing object code and reserved sections in as necessary
+    #
+    #   Reserved sections are denoted using a bang(!)
+    #   Records are only iterated over, so they may be streamed (see the spill module)
+    #
+    items = iter(lst)
+    lst_item = next(items, None)
+    while lst_item is not None:
+
+        # evaluate the item after the current item in the lst
+        # necessary to determine program counter value
+        next_item = next(items, None)
+
+        if 'Error' not in lst_item:
+
+            mneumonic = None
+            meta = lst_item.get('Meta', None)
+            if meta:
+                mneumonic = meta.get('mneumonic', None)
+
+            #
+            # Process Reserved Section Header
+            #
+            # Reserved sections consist of a header and a body, essentially
+            # The header consists of the memory location in which the string of object codes should
+            #   be written.
+            #
+            if mneumonic in ['RESW', 'RESB'] or current_address is None:
+                res_count += 1
+
+                if mneumonic in ['RESW', 'RESB']:
+                    obj_file.write("!" + "\n")
+
+                if next_item is not None:
+                    current_address = next_item['Location']
+
+                if start_address is None:
+                    start_address = current_address
+
+                obj_file.write(obj_address(current_address) + "\n")
+                if res_count == res_total:
+                    obj_file.write(obj_address(start_address) + "\n")
+                else:
+                    obj_file.write("000000".zfill(6) + "\n")
+
+            #
+            # Process Reserved Section Body record
+            #
+            # The body consists of any assembled object codes until the next reserved section or the end of the
+            #   program.
+            #
+            # Object Code generated during Pass 2 is written to file as-is
+            #
+            elif len(lst_item['Object Code']) > 0:
+                obj_file.write(lst_item['Object Code'] + "\n")
+
+        lst_item = next_item
+
+    obj_file.write("!" + "\n")
+
+
+#
+#   Write Error File Function
+#   Compile a compact list of the errors found during assembly, one per line with its line id
+#
+#   err_file - open file to write to
+#   lst - lst record to write errors from
+#
+def write_errors(err_file, lst):
+    for lst_item in lst:
+        if 'Error' in lst_item:
+            err_file.write(lst_item['Line ID'] + "\t" + lst_item['Error'] + "\n")
+
+
+#
+#   Obj Address Function
+#   Formats the location of a lst record as a 6 digit memory location
+#
+#   Locations are formatted by util.add_lst_record, or left as hex() when no listing is kept.
+#
+def obj_address(location):
+    if len(location.strip()) == 0:
+        return location.zfill(6)
+    return hex(int(location, 16))[2:].upper().zfill(6)
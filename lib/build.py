@@ -0,0 +1,229 @@
+#
+#
+#   Build
+#   This module assembles many programs at once, overlapping reading, assembling and writing files
+#
+#   Each program moves through three stages:
+#       read the source file                        on a thread, so other work continues while waiting on storage
+#       assemble it and render its lst/obj/lnk files in a worker process, since assembly is CPU-bound
+#       write the rendered files                    on threads, all files of a program written concurrently
+#
+#   While one program is being assembled, the sources of the programs after it are already being read, and the
+#       files of the programs before it are being written.
+#
+#   Only a limited number of programs are in flight (read but not yet written) at once. Further programs wait
+#       until one is finished, so memory stays capped no matter how many programs are built.
+#
+#
+
+from lib import assembler, linker, source
+import asyncio
+import io
+import os
+
+
+#
+#   Read Source Function
+#   reads a source file into memory as bytes
+#
+def read_source(filename):
+    with open(filename, "rb") as file:
+        return file.read()
+
+
+#
+#   Write Output Function
+#   writes a rendered file, or removes the file if there is nothing to write
+#
+def write_output(filename, text):
+    if text is None:
+        if os.path.exists(filename):
+            os.remove(filename)
+        return
+
+    with open(filename, "w") as file:
+        file.write(text)
+
+
+#
+#   Assemble Source Function
+#   assembles a program read into memory and renders its files, ready to be written
+#
+#   filename - name of the source file, used to name the rendered files
+#   data - bytes of the source file
+#   optimize - if set, format 3/4 operations are sized automatically (see pass1.process)
+#   listing - if not set, the lst file is skipped, and an err file is written only if assembly fails
+#   spill_records - if set, lst records are kept in temporary files rather than in memory (see the spill module)
+#
+#   This function may return True or False to denote success and failure, along with the pass which
+#       completed last, or 0 if the program could not be assembled at all, and the number of source lines.
+#
+def assemble_source(filename, data, optimize=False, listing=True, spill_records=False):
+    response = {
+        'filename': filename,
+        'success': False,
+        'pass': 0,
+        'message': None,
+        'report': filename + ".lst" if listing else filename + ".err",
+        'lines': data.count(b"\n") + (1 if len(data) > 0 and not data.endswith(b"\n") else 0),
+        'included': [],
+        'outputs': []
+    }
+
+    result = None
+    try:
+        result = assembler.assemble(source.buffer_lines(data, listing), optimize, listing, filename, spill_records)
+
+        if listing:
+            lst_file = io.StringIO()
+            assembler.write_lst(lst_file, result['lst'])
+            response['outputs'].append((filename + ".lst", lst_file.getvalue()))
+        elif not result['success']:
+            err_file = io.StringIO()
+            assembler.write_errors(err_file, result['lst'])
+            response['outputs'].append((filename + ".err", err_file.getvalue()))
+        else:
+            response['outputs'].append((filename + ".err", None))
+
+        if result['success']:
+            obj_file = io.StringIO()
+            assembler.write_obj(obj_file, result['lst'])
+            response['outputs'].append((filename + ".obj", obj_file.getvalue()))
+
+            lnk_file = io.StringIO()
+            linker.write_link_info(lnk_file, result['link'], os.path.splitext(os.path.basename(filename))[0])
+            response['outputs'].append((filename + ".lnk", lnk_file.getvalue()))
+    except Exception as e:
+        response['message'] = "Assembly failed: " + str(e)
+        return response
+    finally:
+        # spilled records are kept in temporary files until closed
+        if spill_records and result is not None:
+            result['lst'].close()
+
+    response['success'] = result['success']
+    response['pass'] = result['pass']
+    response['included'] = result['included']
+    return response
+
+
+#
+#   Build Here Function
+#   assembles every program one after another in this process, writing the lst, obj and lnk files of each next to
+#       its source
+#
+#   Used when programs are reassembled as they change, where starting worker processes, or waiting on them, would
+#       take longer than assembling the few programs which changed.
+#
+#   Returns the result of each program, in the order given
+#
+def build_here(filenames, optimize=False, listing=True, spill_records=False):
+    results = []
+    for filename in filenames:
+        try:
+            data = read_source(filename)
+        except (IOError, OSError) as e:
+            results.append(unreadable(filename, e))
+            continue
+
+        result = assemble_source(filename, data, optimize, listing, spill_records)
+        for output_filename, text in result['outputs']:
+            write_output(output_filename, text)
+
+        result['outputs'] = [output_filename for output_filename, text in result['outputs']]
+        results.append(result)
+
+    return results
+
+
+#
+#   Unreadable Function
+#   the result of a program whose source could not be read
+#
+def unreadable(filename, e):
+    return {
+        'filename': filename,
+        'success': False,
+        'pass': 0,
+        'message': "File could not be loaded: " + str(e),
+        'report': None,
+        'lines': 0,
+        'included': [],
+        'outputs': []
+    }
+
+
+#
+#   Build Function
+#   assembles every program, writing the lst, obj and lnk files of each next to its source
+#
+#   filenames - source files to assemble
+#   executor - executor to assemble programs in, typically a pool of worker processes
+#   optimize - if set, format 3/4 operations are sized automatically (see pass1.process)
+#   in_flight - number of programs which may be read, assembled or written at once
+#   io_executor - executor to read and write files in, defaults to the event loop's thread pool
+#   listing - if not set, lst files are skipped, and err files are written only for programs which fail
+#   spill_records - if set, lst records are kept in temporary files rather than in memory (see the spill module)
+#
+#   Returns the result of each program, in the order given
+#
+async def build(filenames, executor, optimize=False, in_flight=4, io_executor=None, listing=True,
+                spill_records=False):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, in_flight))
+
+    async def build_file(filename):
+        async with semaphore:
+            try:
+                data = await loop.run_in_executor(io_executor, read_source, filename)
+            except (IOError, OSError) as e:
+                return unreadable(filename, e)
+
+            result = await loop.run_in_executor(executor, assemble_source, filename, data, optimize, listing,
+                                                spill_records)
+            del data
+
+            await asyncio.gather(*[
+                loop.run_in_executor(io_executor, write_output, output_filename, text)
+                for output_filename, text in result['outputs']
+            ])
+
+            # keep only the names of the written files, so rendered files are not held until the build finishes
+            result['outputs'] = [output_filename for output_filename, text in result['outputs']]
+            return result
+
+    return await asyncio.gather(*[build_file(filename) for filename in filenames])
+
+
+#
+#   Report Function
+#   summarizes the results of a build
+#
+#   results - results returned by the build function
+#   elapsed - time the build took, in seconds
+#
+#   Returns the lines of the report
+#
+def report(results, elapsed):
+    failed = [result for result in results if not result['success']]
+    lines_assembled = sum(result['lines'] for result in results)
+
+    report_lines = [
+        "BUILD REPORT",
+        "------------",
+        str(len(results)) + " programs, " + str(len(results) - len(failed)) + " assembled, " +
+        str(len(failed)) + " failed",
+        str(lines_assembled) + " lines in " + "%.3f" % elapsed + " seconds"
+    ]
+
+    for result in failed:
+        if result['message'] is not None:
+            report_lines.append("Errors: " + result['filename'] + ": " + result['message'])
+        elif result['pass'] == 1:
+            report_lines.append("Errors (pass 1): " + result['filename'] + ": No object code generated. Refer to " +
+                                result['report'] + ".")
+        else:
+            report_lines.append("Errors (pass 2): " + result['filename'] + ": no object file instantiation. "
+                                "Refer to " + result['report'] + ".")
+
+    return report_lines
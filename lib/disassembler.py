@@ -0,0 +1,387 @@
+#
+#
+#   Disassembler
+#   The Disassembler decodes the object code of an obj file back into operations, to check what the assembler wrote
+#
+#   Each record of an obj file is one assembled line item, so records are decoded one at a time, rather than
+#       guessing where each operation starts. Opcodes are found through util.lookup_opcode, a reverse index of the
+#       operation table keyed on the top six bits of the opcode, and fields are unpacked by the encoder.
+#
+#   Records which do not decode to an operation of exactly their length are data (BYTE, WORD or literals).
+#       WORDs and BYTEs which happen to decode as an operation cannot be told apart from one.
+#
+#   Targets of PC relative operations are resolved from the location of the operation. Targets of Base relative
+#       operations are resolved from the last LDB with an immediate operand, as the BASE directive usually follows
+#       one, or from a base address given up front.
+#
+#   Records may be verified against the lst or json file written along with the obj file, checking each record
+#       decodes to the line of source assembled at its location (see the verify function).
+#
+#   The obj file is read a line at a time (see objfile.iterate_object), so obj files of any size can be verified.
+#
+#
+
+from lib import encoder, objfile, source, util
+import itertools
+import json
+
+__author__ = 'Nicholas Pickering'
+
+# register names, by register number
+REGISTER_NAMES = dict((int(util.lookup_register(name)), name)
+                      for name in ['A', 'X', 'L', 'B', 'S', 'T', 'F', 'PC', 'SW'])
+
+# format 2 operations with a single register, and with a register and a count
+SINGLE_REGISTER = ['CLEAR', 'TIXR']
+SHIFT = ['SHIFTL', 'SHIFTR']
+
+
+#
+#   Disassemble Function
+#   decodes every record of an obj file
+#
+#   file - open obj file, or any iterable of its lines
+#   base_address - base address in effect at the start of the program, if known
+#
+#   Produces a dict for each section header, holding its 'section' address and 'start' line, and a dict for each
+#       record (see disassemble_record)
+#
+def disassemble(file, base_address=None):
+    for item in objfile.iterate_object(file):
+        if item[0] == 'section':
+            yield {
+                'section': item[1],
+                'start': item[2]
+            }
+            continue
+
+        instruction = disassemble_record(item[1], item[2], base_address)
+
+        # a base address loaded immediately is assumed to be declared with BASE
+        if instruction['mneumonic'] == 'LDB' and instruction['addressing'] == '#' and \
+                instruction['target'] is not None:
+            base_address = instruction['target']
+
+        yield instruction
+
+
+#
+#   Disassemble Record Function
+#   decodes a single record of an obj file
+#
+#   location - memory location of the record
+#   record - object code of the record, in hex
+#   base_address - base address in effect, if known
+#
+#   Returns a dict holding:
+#       location, code - location and object code of the record
+#       decoded - fields unpacked by encoder.decode, None if the record is data
+#       mneumonic - mneumonic of the operation, BYTE for data
+#       prefix - + for format 4 operations, * for SIC operations
+#       addressing - # for immediate addressing, @ for indirect addressing
+#       operand - operand as it could be written in a program, with targets as hex addresses
+#       target - memory location, or immediate value, the operation refers to, None if it is not known
+#
+def disassemble_record(location, record, base_address=None):
+    instruction = {
+        'location': location,
+        'code': record,
+        'decoded': None,
+        'mneumonic': 'BYTE',
+        'prefix': '',
+        'addressing': '',
+        'operand': "X'" + record + "'",
+        'target': None
+    }
+
+    try:
+        data = bytes.fromhex(record)
+    except ValueError:
+        return instruction
+
+    decoded = encoder.decode(data, 0)
+    if decoded is None or decoded['length'] != len(data):
+        return instruction
+
+    operation = decoded['operation']
+    instruction['decoded'] = decoded
+    instruction['mneumonic'] = operation.name
+    instruction['operand'] = ''
+
+    # format 1, no operand
+    if decoded['format'] == 1:
+        return instruction
+
+    # format 2, registers
+    if decoded['format'] == 2:
+        r1 = REGISTER_NAMES.get(decoded['r1'], str(decoded['r1'] + 1))
+        if operation.name in SINGLE_REGISTER:
+            instruction['operand'] = r1
+        elif operation.name in SHIFT:
+            instruction['operand'] = r1 + "," + str(decoded['r2'] + 1)
+        else:
+            instruction['operand'] = r1 + "," + REGISTER_NAMES.get(decoded['r2'], str(decoded['r2'] + 1))
+        return instruction
+
+    ni = decoded['ni']
+    xbpe = decoded['xbpe']
+    field = decoded['field']
+
+    if ni == encoder.NI_SIC:
+        instruction['prefix'] = '*'
+        target = field
+    elif decoded['format'] == 4:
+        instruction['prefix'] = '+'
+        target = field
+    elif xbpe & encoder.P:
+        target = (location + decoded['length'] + encoder.signed_displacement(field)) & 0xFFFFF
+    elif xbpe & encoder.B:
+        target = None if base_address is None else base_address + field
+    else:
+        target = field
+
+    if ni == encoder.NI_IMMEDIATE:
+        instruction['addressing'] = '#'
+    elif ni == encoder.NI_INDIRECT:
+        instruction['addressing'] = '@'
+
+    # RSUB takes no operand
+    if operation.name == 'RSUB' and field == 0:
+        return instruction
+
+    instruction['target'] = target
+    if target is None:
+        instruction['operand'] = util.hexized(field, 3).upper() + "(B)"
+    elif ni == encoder.NI_IMMEDIATE and not xbpe & (encoder.B | encoder.P):
+        instruction['operand'] = str(target)
+    else:
+        instruction['operand'] = hex(target)[2:].upper().zfill(5)
+
+    if xbpe & encoder.X:
+        instruction['operand'] += ",X"
+
+    return instruction
+
+
+#
+#   Read Listing Function
+#   reads the lst file, or json file (see assembler.write_json), written by the assembler along with an obj file
+#
+#   file - open lst or json file
+#
+#   Returns a dict holding:
+#       lines - the line items with object code, by memory location, each a dict of the mneumonic, operand,
+#           addressing, indexed, extended and sic tokens of the source, the line id, whether -O widened it (None if
+#           the listing does not tell), and the base address in effect (from BASE and NOBASE directives)
+#       symbols - value of every symbol, by name. Symbols of an lst file are found from the labels of its lines.
+#
+def read_listing(file):
+    first_line = file.readline()
+    if first_line.startswith("{"):
+        items = json_listing(itertools.chain([first_line], file))
+    else:
+        items = lst_listing(file)
+
+    listing = {
+        'lines': {},
+        'symbols': {}
+    }
+    lines = []
+    for item in items:
+        if 'symbols' in item:
+            listing['symbols'].update(item['symbols'])
+        else:
+            lines.append(item)
+            if item['label'] and item['location'] is not None:
+                listing['symbols'].setdefault(item['label'], item['location'])
+
+    # the base address in effect follows the BASE and NOBASE directives, in order
+    base_address = None
+    for item in lines:
+        if item['mneumonic'] == 'BASE':
+            base_address = listing['symbols'].get(item['operand'], None)
+        elif item['mneumonic'] == 'NOBASE':
+            base_address = None
+        elif item['object'] and item['location'] is not None:
+            item['base'] = base_address
+            listing['lines'][item['location']] = item
+
+    return listing
+
+
+#
+#   JSON Listing Function
+#   produces the line items and symbols of a json file, in the form used by read_listing
+#
+def json_listing(lines):
+    for line in lines:
+        if len(line.strip()) == 0:
+            continue
+
+        item = json.loads(line)
+        if item['type'] == 'symbols':
+            yield {'symbols': item['symbols']}
+        elif item['type'] == 'line' and 'mneumonic' in item:
+            literal = 'literal' in item['flags']
+            yield {
+                'line': item['line'],
+                'location': item['location'],
+                'object': item['object'],
+                'label': None if literal else label_of(item['source']),
+                'mneumonic': item['mneumonic'],
+                'operand': item['operand'],
+                'addressing': item['addressing'],
+                'indexed': 'indexed' in item['flags'],
+                'extended': 'extended' in item['flags'],
+                'sic': 'sic' in item['flags'],
+                'widened': 'widened' in item['flags']
+            }
+
+
+#
+#   Lst Listing Function
+#   produces the line items of an lst file, in the form used by read_listing
+#
+#   Each line item is written as: line id, location, object code and source, separated by two tabs. The sources
+#       of literals, written by LTORG and END, start with = and their operand.
+#
+def lst_listing(lines):
+    for line in lines:
+        fields = line.rstrip("\n").split("\t\t", 3)
+        if len(fields) < 4 or fields[0].startswith("*") or len(fields[0].strip()) == 0:
+            continue
+
+        try:
+            location = int(fields[1].strip(), 16)
+        except ValueError:
+            location = None
+        code = fields[2].strip()
+
+        if fields[3].startswith("="):
+            operand = fields[3].split()[0][1:]
+            yield {'symbols': {operand: location}} if location is not None else {'symbols': {}}
+            tokens = {'label': '', 'mneumonic': 'BYTE', 'operand': operand, 'addressing': '', 'indexed': False,
+                      'extended': False, 'sic': False}
+        else:
+            tokenized = source.tokenize_bytes(fields[3].encode("utf-8"), False)
+            if tokenized is None or tokenized[1] is None:
+                continue
+            tokens = tokenized[1]
+
+        yield {
+            'line': fields[0],
+            'location': location,
+            'object': code,
+            'label': tokens['label'],
+            'mneumonic': tokens['mneumonic'],
+            'operand': tokens['operand'],
+            'addressing': tokens['addressing'].strip(),
+            'indexed': tokens['indexed'],
+            'extended': tokens['extended'],
+            'sic': tokens['sic'],
+            'widened': None
+        }
+
+
+#
+#   Label Of Function
+#   the label in the label column of a source line
+#
+def label_of(line):
+    if line is None:
+        return None
+    return line[:7].replace(" ", "") or None
+
+
+#
+#   Verify Function
+#   checks a decoded record against the line assembled at its location, as read by read_listing
+#
+#   Rather than encoding the record again, which would only repeat the decoding, the record is checked against the
+#       source of the line: data must hold the bytes of its BYTE or WORD operand, and an operation must decode to
+#       the mneumonic, format, addressing method and index of the source, reaching the value of its operand.
+#
+#   instruction - record decoded by disassemble_record
+#   line - line item from read_listing, None if no line was assembled at the location
+#   symbols - value of every symbol, by name
+#
+#   Returns a list of what does not match, empty if the record matches its line
+#
+def verify(instruction, line, symbols):
+    if line is None:
+        return ["no line was assembled at this location"]
+
+    code = instruction['code'].upper()
+    mneumonic = line['mneumonic']
+    operand = line['operand']
+
+    # data is checked byte for byte
+    if mneumonic == 'BYTE':
+        literal = operand[1:].replace("'", '')
+        expected = literal.upper() if operand[:1] == 'X' else literal.encode("utf-8").hex().upper()
+        return [] if code == expected else ["expected data " + expected]
+    if mneumonic == 'WORD':
+        expected = hex(int(operand) & 0xFFFFFF)[2:].upper().zfill(6)
+        return [] if code == expected else ["expected data " + expected]
+
+    decoded = instruction['decoded']
+    if decoded is None:
+        return ["expected " + mneumonic + ", which does not decode"]
+
+    problems = []
+    if instruction['mneumonic'] != mneumonic:
+        problems.append("expected " + mneumonic)
+
+    # operations widened by -O are only marked in a json file, an lst file keeps the source as written
+    prefix = '+' if line['extended'] else '*' if line['sic'] else ''
+    widened = line['widened'] is None and prefix == '' and instruction['prefix'] == '+'
+    if decoded['format'] >= 3 and instruction['prefix'] != prefix and not widened:
+        problems.append("expected " + ("format 4" if prefix == '+' else "SIC" if prefix == '*' else "format 3"))
+
+    # format 2 operations name registers rather than memory
+    if decoded['format'] == 2:
+        registers = (operand + (",X" if line['indexed'] else "")).split(',')
+        expected = [int(util.lookup_register(register)) for register in registers] + [0]
+        if [decoded['r1'], decoded['r2']] != expected[:2]:
+            problems.append("expected registers " + ",".join(registers))
+        return problems
+
+    if decoded['format'] == 1 or mneumonic == 'RSUB':
+        return problems
+
+    addressing = line['addressing'] if line['addressing'] in ['#', '@'] else ''
+    if instruction['addressing'] != addressing:
+        problems.append("expected addressing " + (addressing or "simple"))
+
+    if bool(decoded['xbpe'] & encoder.X) != line['indexed']:
+        problems.append("expected " + ("indexed" if line['indexed'] else "not indexed"))
+
+    # the target must be the value of the operand, external symbols are filled in by the linker
+    if addressing == '#' and util.is_number(operand):
+        expected = int(operand) & (0xFFFFF if decoded['format'] == 4 else 0xFFF)
+    elif operand in symbols:
+        expected = symbols[operand]
+    else:
+        return problems
+
+    target = instruction['target']
+    if target is None and line['base'] is not None:
+        target = disassemble_record(instruction['location'], instruction['code'], line['base'])['target']
+    if target != expected:
+        problems.append("expected target " + hex(expected)[2:].upper().zfill(5))
+
+    return problems
+
+
+#
+#   Format Function
+#   formats a decoded record as a line of the disassembly
+#
+def format_instruction(instruction):
+    if 'section' in instruction:
+        return "SECTION " + hex(instruction['section'])[2:].upper().zfill(5)
+
+    line = hex(instruction['location'])[2:].upper().zfill(5) + "\t" + instruction['code'].upper().ljust(8) + "\t" + \
+        (instruction['prefix'] or " ") + instruction['mneumonic'].ljust(7) + \
+        (instruction['addressing'] or " ") + instruction['operand']
+    return line.rstrip()
@@ -0,0 +1,178 @@
+#
+#
+#   Encoder
+#   This module packs SIC/XE operations into integers and unpacks them again
+#
+#   Operations are assembled from bit fields, rather than from strings:
+#
+#       format 1    opcode(8)
+#       format 2    opcode(8) r1(4) r2(4)
+#       format 3    opcode(6) n i x b p e disp(12)
+#       format 4    opcode(6) n i x b p e address(20)
+#       SIC         opcode(8) x address(15)
+#
+#   An encoded operation is an integer along with its length in bytes. It is only formatted as hex, or serialized
+#       as bytes, once it is written out.
+#
+#   Displacements and addresses are checked against the width of their field, raising a ValueError rather than
+#       being cut down to fit, so an out of range operand never assembles to a different address.
+#
+#   Decoding is the reverse, and is shared by anything reading object code back (the simulator, the disassembler).
+#
+#
+
+from lib import util
+
+# n and i flags
+NI_SIC = 0
+NI_IMMEDIATE = 1
+NI_INDIRECT = 2
+NI_SIMPLE = 3
+
+# x, b, p and e flags
+X = 8
+B = 4
+P = 2
+E = 1
+
+
+#   Encode Format 1 Function
+#   opcode - opcode of the operation, as an integer
+def encode_format1(opcode):
+    return opcode, 1
+
+
+#   Encode Format 2 Function
+#   opcode - opcode of the operation, as an integer
+#   r1, r2 - register numbers (see util.lookup_register)
+def encode_format2(opcode, r1, r2=0):
+    return (opcode << 8) | ((r1 & 0xF) << 4) | (r2 & 0xF), 2
+
+
+#   Encode Format 3 Function
+#   opcode - opcode of the operation, as an integer
+#   ni - n and i flags
+#   xbpe - x, b, p and e flags, e is always clear
+#   displacement - 12 bit displacement, negative displacements are stored as two's complement
+def encode_format3(opcode, ni, xbpe, displacement):
+    if not -2048 <= displacement < 4096:
+        raise ValueError("Displacement out of range for format 3: " + str(displacement))
+    return (((opcode & 0xFC) | ni) << 16) | ((xbpe & 0xE) << 12) | (displacement & 0xFFF), 3
+
+
+#   Encode Format 4 Function
+#   opcode - opcode of the operation, as an integer
+#   ni - n and i flags
+#   xbpe - x, b, p and e flags, e is always set
+#   address - 20 bit address, negative immediate values are stored as two's complement
+def encode_format4(opcode, ni, xbpe, address):
+    if not -0x80000 <= address <= 0xFFFFF:
+        raise ValueError("Address out of range for format 4: " + str(address))
+    return (((opcode & 0xFC) | ni) << 24) | (((xbpe | E) & 0xF) << 20) | (address & 0xFFFFF), 4
+
+
+#   Encode SIC Function
+#   opcode - opcode of the operation, as an integer
+#   indexed - if set, the x flag is set
+#   address - 15 bit address
+def encode_sic(opcode, indexed, address):
+    if not 0 <= address <= 0x7FFF:
+        raise ValueError("Address out of range for SIC: " + str(address))
+    return ((opcode & 0xFC) << 16) | (0x8000 if indexed else 0) | (address & 0x7FFF), 3
+
+
+#   To Hex Function
+#   Formats an encoded operation as upper case hex, two digits per byte
+def to_hex(value, length):
+    return "%0*X" % (length * 2, value)
+
+
+#   To Bytes Function
+#   Serializes an encoded operation as bytes
+def to_bytes(value, length):
+    return value.to_bytes(length, 'big')
+
+
+#
+#   Decode Function
+#   Unpacks the operation at a memory location
+#
+#   memory - bytes, or bytearray, holding object code
+#   address - position of the operation in memory
+#
+#   Returns None if the opcode is not known, or the operation runs past the end of memory. Otherwise, returns:
+#       operation - the Operation decoded
+#       format - 1, 2, 3 or 4, SIC operations are format 3
+#       length - length of the operation in bytes
+#       ni - n and i flags, NI_SIC for SIC operations
+#       xbpe - x, b, p and e flags, only x for SIC operations
+#       field - displacement, or address, as stored
+#       r1, r2 - registers of a format 2 operation
+#
+def decode(memory, address):
+    if address < 0 or address >= len(memory):
+        return None
+
+    first = memory[address]
+    operation = util.lookup_opcode(first)
+    if operation is None:
+        return None
+
+    decoded = {
+        'operation': operation,
+        'format': 3,
+        'length': 3,
+        'ni': 0,
+        'xbpe': 0,
+        'field': 0,
+        'r1': 0,
+        'r2': 0
+    }
+
+    if operation.format_list == [1]:
+        decoded['format'] = 1
+        decoded['length'] = 1
+        return decoded
+
+    if address + 1 >= len(memory):
+        return None
+    second = memory[address + 1]
+
+    if operation.format_list == [2]:
+        decoded['format'] = 2
+        decoded['length'] = 2
+        decoded['r1'] = second >> 4
+        decoded['r2'] = second & 0xF
+        return decoded
+
+    decoded['ni'] = first & 0x3
+    if decoded['ni'] == NI_SIC:
+        decoded['xbpe'] = X if second & 0x80 else 0
+        field_length = 3
+    else:
+        decoded['xbpe'] = second >> 4
+        if decoded['xbpe'] & E:
+            decoded['format'] = 4
+            decoded['length'] = 4
+        field_length = decoded['length']
+
+    if address + field_length > len(memory):
+        return None
+
+    field = int.from_bytes(memory[address + 1:address + field_length], 'big')
+    if decoded['ni'] == NI_SIC:
+        decoded['field'] = field & 0x7FFF
+    elif decoded['format'] == 4:
+        decoded['field'] = field & 0xFFFFF
+    else:
+        decoded['field'] = field & 0xFFF
+
+    return decoded
+
+
+#   Signed Displacement Function
+#   Interprets a 12 bit displacement as a signed integer, as used by PC relative addressing
+def signed_displacement(displacement):
+    if displacement & 0x800:
+        return displacement - 0x1000
+    return displacement
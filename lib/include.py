@@ -0,0 +1,143 @@
+#
+#
+#   Include
+#   This module reads the files named by COPY directives, so shared definitions and subroutines may be kept in
+#       a single file rather than pasted into every program
+#
+#   An included file is tokenized once (see the source module) and its lines are cached on disk, in an __asmcache__
+#       directory next to the file. Later builds splice the cached lines into Pass 1 instead of re-reading and
+#       re-tokenizing the text.
+#
+#   A cached file is used as-is while the modification time and size of the included file are unchanged. Otherwise
+#       the included file is read and hashed, and the cached lines are still used if its content is unchanged.
+#
+#   Only tokens are cached. Memory locations and symbols depend on where a file is included, so Pass 1 computes
+#       them for every program, as for any other line.
+#
+#   hashlib and pickle are only imported once a file is included, as Pass 1 imports this module for every program.
+#
+#
+
+from lib import source
+import os
+
+CACHE_DIRECTORY = "__asmcache__"
+
+# changed whenever the cached form of a file changes, so caches written by older versions are ignored
+CACHE_VERSION = 1
+
+
+#
+#   Resolve Function
+#   determines the path of an included file
+#
+#   name - file name given to COPY
+#   including_filename - file containing the COPY directive, None if it is not known
+#
+#   Relative names are relative to the directory of the including file, or the working directory.
+#
+def resolve(name, including_filename=None):
+    if not os.path.isabs(name) and including_filename is not None:
+        name = os.path.join(os.path.dirname(including_filename), name)
+    return os.path.abspath(name)
+
+
+#
+#   Cache Filename Function
+#   determines where the tokenized lines of an included file are cached
+#
+def cache_filename(filename):
+    return os.path.join(os.path.dirname(filename), CACHE_DIRECTORY, os.path.basename(filename) + ".pickle")
+
+
+#
+#   Load Function
+#   reads the tokenized lines of an included file, from its cache where possible
+#
+#   filename - path of the included file (see resolve)
+#   keep_source - if not set, the source of each line is produced as None
+#
+#   Returns a list of lines, as produced by the source module. Raises IOError/OSError if the file cannot be read.
+#
+def load(filename, keep_source=True):
+    status = os.stat(filename)
+    cached = read_cache(filename)
+
+    if cached is not None and (cached['mtime'], cached['size']) == (status.st_mtime_ns, status.st_size):
+        lines = cached['lines']
+    else:
+        import hashlib
+        with open(filename, "rb") as file:
+            data = file.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        if cached is not None and cached['hash'] == digest:
+            lines = cached['lines']
+        else:
+            lines = list(source.buffer_lines(data))
+
+        write_cache(filename, {
+            'version': CACHE_VERSION,
+            'mtime': status.st_mtime_ns,
+            'size': status.st_size,
+            'hash': digest,
+            'lines': lines
+        })
+
+    if not keep_source:
+        return [(None, tokens) for line, tokens in lines]
+    return lines
+
+
+#
+#   Read Cache Function
+#   reads the cached form of an included file, or None if there is no usable cache
+#
+def read_cache(filename):
+    import pickle
+    try:
+        with open(cache_filename(filename), "rb") as file:
+            cached = pickle.load(file)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+    if not isinstance(cached, dict) or cached.get('version', None) != CACHE_VERSION:
+        return None
+    return cached
+
+
+#
+#   Write Cache Function
+#   caches an included file, caching is skipped if the cache directory cannot be written
+#
+#   The cache is written to a temporary file first, so programs assembled in parallel never read a partial cache.
+#
+def write_cache(filename, cached):
+    import pickle
+    cache_file = cache_filename(filename)
+    temporary_file = cache_file + "." + str(os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(temporary_file, "wb") as file:
+            pickle.dump(cached, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_file, cache_file)
+    except (IOError, OSError):
+        if os.path.exists(temporary_file):
+            os.remove(temporary_file)
+
+
+#
+#   Splice Function
+#   produces lines from a stack of sources, always from the source on top of the stack
+#
+#   stack - list of (filename, iterator of lines) tuples. Pass 1 pushes a source on COPY, and its lines are
+#       produced next. Each source is popped from the stack once it runs out of lines.
+#
+def splice(stack):
+    while len(stack) > 0:
+        try:
+            item = next(stack[-1][1])
+        except StopIteration:
+            stack.pop()
+            continue
+        yield item
@@ -0,0 +1,239 @@
+#
+#
+#   Linker
+#   The Linker combines obj files assembled separately into a single loadable program.
+#
+#   Alongside each obj file, the assembler writes a lnk file describing how the program links with others:
+#
+#       H name start length     program name, assembled start address and length
+#       D symbol address        symbol exported by the program (EXTDEF)
+#       R symbol                symbol imported from another program (EXTREF)
+#       M address length symbol field of length half-bytes at address, to which the address of symbol is added
+#         [bits]                only the low bits of the field are modified when given, as the 15 bit address
+#                               of a SIC operation, which follows its x flag
+#
+#   Addresses and lengths are written in hex. A modification naming the program itself relocates an address
+#       within the program to where the program is loaded.
+#
+#   Linking follows the following:
+#
+#       place each program after the one before it
+#       index every exported symbol by name, along with every program name
+#       load the object code of every program into a single memory image
+#       apply every modification to the image
+#       write the image as a single obj file
+#
+#
+
+from lib import util, objfile
+
+
+#
+#   Write Link Info Function
+#   writes the link information produced by Pass 2 into a lnk file
+#
+#   file - open lnk file to write to
+#   link - link information returned by Pass 2
+#   name - program name to use if the program has none
+#
+def write_link_info(file, link, name):
+    name = link['name'] or name
+    file.write("H " + name + " " + util.hexized(link['start'], 6).upper() + " " +
+               util.hexized(link['length'], 6).upper() + "\n")
+
+    for symbol, address in link['definitions']:
+        file.write("D " + symbol + " " + util.hexized(address, 6).upper() + "\n")
+
+    for symbol in link['references']:
+        file.write("R " + symbol + "\n")
+
+    for address, length, symbol, bits in link['modifications']:
+        file.write("M " + util.hexized(address, 6).upper() + " " + hex(length)[2:].upper().zfill(2) + " " +
+                   (symbol or name) + ("" if bits == length * 4 else " " + hex(bits)[2:].upper().zfill(2)) + "\n")
+
+
+#
+#   Read Module Function
+#   reads an obj file, and the lnk file written alongside it, into a module ready for linking
+#
+#   obj_filename - name of the obj file, the lnk file is found by replacing its .obj extension
+#
+def read_module(obj_filename):
+    with open(obj_filename, "r") as obj_file:
+        obj = objfile.read_object(obj_file)
+
+    module = {
+        'filename': obj_filename,
+        'name': None,
+        'start': 0,
+        'length': 0,
+        'definitions': [],
+        'references': [],
+        'modifications': [],
+        'entry': obj['start'],
+        'sections': obj['sections']
+    }
+
+    lnk_filename = obj_filename[:-len(".obj")] if obj_filename.endswith(".obj") else obj_filename
+    with open(lnk_filename + ".lnk", "r") as lnk_file:
+        for line in lnk_file:
+            tokens = line.split()
+            if len(tokens) == 0:
+                continue
+
+            if tokens[0] == 'H':
+                module['name'] = tokens[1]
+                module['start'] = int(tokens[2], 16)
+                module['length'] = int(tokens[3], 16)
+            elif tokens[0] == 'D':
+                module['definitions'].append((tokens[1], int(tokens[2], 16)))
+            elif tokens[0] == 'R':
+                module['references'].append(tokens[1])
+            elif tokens[0] == 'M':
+                length = int(tokens[2], 16)
+                bits = int(tokens[4], 16) if len(tokens) > 4 else length * 4
+                module['modifications'].append((int(tokens[1], 16), length, tokens[3], bits))
+
+    return module
+
+
+#
+#   Link Function
+#   links modules read by read_module into a single program
+#
+#   modules - list of modules, the first module provides the start address of the program
+#   load_address - memory location of the first module, defaults to the first module's assembled start address
+#
+#   This function may return True or False to denote success and failure, along with a list of errors.
+#
+#   This function also returns the linked sections and start address, ready to be written as an obj file,
+#       and a load map of where each module was placed.
+#
+def link(modules, load_address=None):
+    errors = []
+
+    if len(modules) == 0:
+        return {
+            'success': False,
+            'errors': ["No modules to link"],
+            'sections': [],
+            'start': 0,
+            'map': []
+        }
+
+    #
+    #   Place Modules
+    #   Each module is placed directly after the module before it
+    #
+    if load_address is None:
+        load_address = modules[0]['start']
+
+    address = load_address
+    for module in modules:
+        module['load'] = address
+        module['delta'] = address - module['start']
+        address += module['length']
+    image_end = address
+
+    #
+    #   Build Global Symbol Index
+    #   Every program name and exported symbol is indexed by name. The index is a hash table, so each
+    #       reference is resolved in constant time no matter how many modules are linked.
+    #
+    global_symbols = dict()
+    for module in modules:
+        if module['name'] in global_symbols:
+            errors.append(module['filename'] + ": Duplicate program name, " + module['name'])
+        global_symbols[module['name']] = module['load']
+
+    for module in modules:
+        for symbol, value in module['definitions']:
+            if symbol in global_symbols:
+                errors.append(module['filename'] + ": Duplicate external definition, " + symbol)
+            else:
+                global_symbols[symbol] = value + module['delta']
+
+    for module in modules:
+        for symbol in module['references']:
+            if symbol not in global_symbols:
+                errors.append(module['filename'] + ": Unresolved external reference, " + symbol)
+
+    if len(errors) > 0:
+        return {
+            'success': False,
+            'errors': errors,
+            'sections': [],
+            'start': 0,
+            'map': []
+        }
+
+    #
+    #   Load Image
+    #   Object code of every module is copied into a single memory image at its relocated memory location
+    #
+    image = bytearray(image_end - load_address)
+    sections = []
+    for module in modules:
+        for section in module['sections']:
+            location = section['address'] + module['delta']
+            records = []
+            for record in section['records']:
+                record_bytes = bytes.fromhex(record)
+                image[location - load_address:location - load_address + len(record_bytes)] = record_bytes
+                records.append((location, len(record_bytes)))
+                location += len(record_bytes)
+
+            sections.append({
+                'address': section['address'] + module['delta'],
+                'records': records
+            })
+
+    #
+    #   Apply Modifications
+    #   Modifications of every module are applied to the image in one pass, a modification naming the module
+    #       itself adds the distance the module was moved from its assembled start address
+    #
+    #   Bits of the field outside the modified bits, such as the x flag of a SIC operation, are left as they were.
+    #       An address which no longer fits in the modified bits is an error.
+    #
+    for module in modules:
+        for address, length, symbol, bits in module['modifications']:
+            if symbol == module['name']:
+                value = module['delta']
+            else:
+                value = global_symbols[symbol]
+
+            position = address + module['delta'] - load_address
+            size = (length + 1) // 2
+            mask = (1 << bits) - 1
+            field = int.from_bytes(image[position:position + size], 'big')
+            if not 0 <= (field & mask) + value <= mask:
+                errors.append(module['filename'] + ": Relocated address out of range at " +
+                              util.hexized(address, 6).upper())
+                continue
+            field = (field & ~mask) | ((field + value) & mask)
+            image[position:position + size] = field.to_bytes(size, 'big')
+
+    if len(errors) > 0:
+        return {
+            'success': False,
+            'errors': errors,
+            'sections': [],
+            'start': 0,
+            'map': []
+        }
+
+    # Object code records are written back out from the modified image
+    for section in sections:
+        section['records'] = [
+            image[location - load_address:location - load_address + size].hex()
+            for location, size in section['records']
+        ]
+
+    return {
+        'success': True,
+        'errors': errors,
+        'sections': sections,
+        'start': modules[0]['entry'] + modules[0]['delta'],
+        'map': [(module['name'], module['load'], module['length']) for module in modules]
+    }
@@ -0,0 +1,102 @@
+#
+#
+#   Object File
+#   This module reads and writes the obj file layout generated by the assembler
+#
+#   An obj file is made up of sections, separated by a bang(!). Each section consists of a header and a body:
+#       the first line of the header is the memory location of the section, the second line is the start address
+#       of the program for the final section and 000000 for every other section.
+#
+#   The body consists of one line of object code per assembled line item, in hex.
+#
+#
+
+
+#
+#   Read Object Function
+#   Parses an obj file into its sections
+#
+#   file - open obj file, or any iterable of its lines
+#
+#   Returns the start address of the program and a list of sections. Each section holds its memory location
+#       and the object code records in its body, with padding removed.
+#
+def read_object(file):
+    start_address = 0
+    sections = []
+
+    for item in iterate_object(file):
+        if item[0] == 'section':
+            sections.append({
+                'address': item[1],
+                'records': []
+            })
+            start_address = item[2]
+        else:
+            sections[-1]['records'].append(item[2])
+
+    return {
+        'start': start_address,
+        'sections': sections
+    }
+
+
+#
+#   Iterate Object Function
+#   Parses an obj file a line at a time, so large obj files are never held in memory
+#
+#   file - open obj file, or any iterable of its lines
+#
+#   Produces a tuple for each section header and for each record in a section body:
+#       ('section', memory location of the section, second header line)
+#       ('record', memory location of the record, object code of the record with padding removed)
+#
+#   The second header line of the final section is the start address of the program.
+#
+def iterate_object(file):
+    state = 'address'
+    address = 0
+    location = 0
+
+    for line in file:
+        line = line.strip()
+
+        if line == '!':
+            state = 'address'
+        elif state == 'address':
+            if len(line) == 0:
+                continue
+            address = int(line, 16)
+            location = address
+            state = 'start'
+        elif state == 'start':
+            yield 'section', address, int(line, 16)
+            state = 'body'
+        elif len(line) > 0:
+            yield 'record', location, line
+            location += len(line) // 2
+
+
+#
+#   Write Object Function
+#   Writes sections out in the obj file layout
+#
+#   file - open file to write to
+#   sections - list of sections, each holding its memory location and object code records
+#   start_address - start address of the program, written into the header of the final section
+#
+def write_object(file, sections, start_address):
+    for i, section in enumerate(sections):
+        if i > 0:
+            file.write("!" + "\n")
+
+        file.write(hex(section['address'])[2:].upper().zfill(6) + "\n")
+        if i == len(sections) - 1:
+            file.write(hex(start_address)[2:].upper().zfill(6) + "\n")
+        else:
+            file.write("000000" + "\n")
+
+        for record in section['records']:
+            file.write(record.upper().ljust(8) + "\n")
+
+    file.write("!" + "\n")
@@ -4,75 +4,77 @@
 #
 #   Pass 1 attempts to process the file in order to determine memory locations for the new program.
 #
-from lib import util, symbol_table
+from lib import util, symbol_table, sizing, source, include, pass2
+import os
 
 
 #
 #   Process Function
 #   This function provides the starting point for the Pass 1
 #
-def process(file):
-    lst = []
+#   file - file containing the SIC/XE program
+#   optimize - if set, format 3/4 operations are sized automatically, widening to format 4 only where
+#       a displacement is out of range
+#   listing - if not set, lst records only keep what is needed to generate the obj file
+#
+def process(file, optimize=False, listing=True):
+    return process_lines(source.read_lines(file), optimize, listing, getattr(file, 'name', None))
+
+
+#
+#   Process Lines Function
+#   This function runs Pass 1 over lines already broken up into tokens (see the source module)
+#
+#   filename - name of the file the lines were read from, files named by COPY are relative to it
+#   lst - where the lst records are appended, a new list by default. A Spill keeps them in a temporary file
+#       instead (see the spill module), but cannot be combined with optimize.
+#
+#   This function also returns the files included by the program, so they may be watched for changes.
+#
+def process_lines(lines, optimize=False, listing=True, filename=None, lst=None):
+    if lst is None:
+        lst = []
+    location = 0
     lines_counted = 0
     literal_stack_hex = []
     literal_stack_char = []
     success = True
 
+    # lines are read from the top of the stack, COPY pushes the lines of the included file
+    sources = [(os.path.abspath(filename) if filename is not None else None, iter(lines))]
+    included = []
+
     #
     #   Process Input File
     #   We iterate over each line to collect information about it, to determine its relevance in the final object code
     #
-    for line in file.readlines():
-        line = line.replace("\n", "")
+    for line, tokens in include.splice(sources):
 
         # Check if line is a comment, if so skip
-        if line[0] == '.':
+        if tokens is None:
             util.add_lst_record(str(lines_counted+1), '        ',
-                                '', line, {"flag": "-comm"}, lst)
+                                '', line, pass2.classify({"flag": "-comm"}), lst, listing)
             lines_counted += 1
             continue
 
-        # Check for blank lines, if so skip
-        if "".join(line.split()) == "":
-            continue
-
-        # break up the line appropriately
-        label = line[:7].replace(" ", "")
-
-        extended = False
-        if len(line) > 8:
-            extended = line[9] == "+"
-
-        sic = False
-        if len(line) > 8:
-            sic = line[9] == "*"
-
-        mneumonic = line[10:16].replace(" ", "")
-
-        addressing = ""
-        if len(line) > 17:
-            addressing = line[18]
-
-        operand = line[19:28].replace(" ", "")
-
-        indexed = False
-        if ",X" in operand:
-            operand = operand.replace(",X", "")
-            indexed = True
+        # the line is already broken up appropriately
+        label = tokens['label']
+        extended = tokens['extended']
+        sic = tokens['sic']
+        mneumonic = tokens['mneumonic']
+        addressing = tokens['addressing']
+        operand = tokens['operand']
+        indexed = tokens['indexed']
 
         # lookup operation for format size
         operation = util.lookup_operation(mneumonic)
 
-        meta = {
-            "label": label,
-            "mneumonic": mneumonic,
-            "operation": operation,
-            "operand": operand,
-            "indexed": indexed,
-            "extended": extended,
-            "sic": sic,
-            "addressing": addressing
-        }
+        meta = tokens
+        meta['operation'] = operation
+
+        # classify the line once, Pass 2 calls the handler of its kind (see pass2.classify)
+        if operation:
+            pass2.classify(meta)
 
         #
         #   Add Line Items to lst File
@@ -81,23 +83,38 @@ def process(file):
         lst_record_added = False
         if not operation:
             util.add_lst_record(str(lines_counted+1), '     ',
-                                '', line, {"flag": "-notop"}, lst)
+                                '', line, pass2.classify({"flag": "-notop"}), lst, listing)
             continue
 
         # Handle START case
-        if operation.name is "START":
-            if lines_counted is 0:
+        if operation.name == "START":
+            if lines_counted == 0:
                 location = int(operand, 16)
             else:
                 util.error("START must be the first line called")
                 continue
 
+        # Handle COPY, the lines of the included file follow this line
+        elif operation.name == "COPY":
+            include_filename = include.resolve(operand, sources[-1][0])
+            if include_filename in [source_filename for source_filename, source_lines in sources]:
+                util.add_lst_error(str(lines_counted+1), "Circular COPY: " + operand, lst)
+                success = False
+            else:
+                try:
+                    sources.append((include_filename, iter(include.load(include_filename, listing))))
+                    if include_filename not in included:
+                        included.append(include_filename)
+                except (IOError, OSError):
+                    util.add_lst_error(str(lines_counted+1), "Included file could not be loaded: " + operand, lst)
+                    success = False
+
         # Handle LTORG / END literal organization
         elif operation.name in ["LTORG", "END"]:
             literal_counter = 0
 
             util.add_lst_record(str(lines_counted+1), str(hex(location)),
-                                '', line, meta, lst)
+                                '', line, meta, lst, listing)
             lst_record_added = True
 
             #
@@ -112,11 +129,13 @@ def process(file):
                 while len(literal_stack_char):
                     literal = literal_stack_char.pop()
                     operand = "C'" + literal + "'"
-                    source = "=" + operand + "\t  BYTE\t  " + operand + "\t\t.literal organization"
+                    source = None
+                    if listing:
+                        source = "=" + operand + "\t  BYTE\t  " + operand + "\t\t.literal organization"
                     write_response = symbol_table.write_symbol(operand, location)
                     operation_size = len(literal)
 
-                    meta = {
+                    meta = pass2.classify({
                         "label": source,
                         "mneumonic": "BYTE",
                         "operation": util.lookup_operation("BYTE"),
@@ -126,9 +145,9 @@ def process(file):
                         "sic": sic,
                         "addressing": addressing,
                         "flag": "-litch"
-                    }
+                    })
                     util.add_lst_record("+" + str(literal_counter+1) + "+", str(hex(location)),
-                                        '', source, meta, lst)
+                                        '', source, meta, lst, listing)
 
                     if write_response['success'] is not True:
                         util.add_lst_error(str(lines_counted+1), write_response['message'], lst)
@@ -143,11 +162,13 @@ def process(file):
                 while len(literal_stack_hex):
                     literal = literal_stack_hex.pop()
                     operand = "X'" + literal + "'"
-                    source = "=" + operand + "\t  BYTE\t  " + operand + "\t.literal organization"
+                    source = None
+                    if listing:
+                        source = "=" + operand + "\t  BYTE\t  " + operand + "\t.literal organization"
                     write_response = symbol_table.write_symbol(operand, location)
                     operation_size = int(len(literal)/2)
 
-                    meta = {
+                    meta = pass2.classify({
                         "label": source,
                         "mneumonic": "BYTE",
                         "operation": util.lookup_operation("BYTE"),
@@ -157,9 +178,9 @@ def process(file):
                         "sic": sic,
                         "addressing": addressing,
                         "flag": "-lithx"
-                    }
+                    })
                     util.add_lst_record("+" + str(literal_counter+1) + "+", str(hex(location)),
-                                        '', source, meta, lst)
+                                        '', source, meta, lst, listing)
 
                     if write_response['success'] is not True:
                         operation_size = 0
@@ -173,6 +194,9 @@ def process(file):
                     location += operation_size
                     literal_counter += 1
 
+            # the literal pool is written to the symbol table as one batch
+            symbol_table.flush_symbols()
+
             lines_counted += 1
 
         # operation is valid, if label exists add it to the symbol table
@@ -194,7 +218,7 @@ def process(file):
         # add line to lst record, if it hasn't already been added
         if not lst_record_added:
             util.add_lst_record(str(lines_counted+1), str(hex(location)),
-                                '', line, meta, lst)
+                                '', line, meta, lst, listing)
 
             #
             #   Determine Memory Location of Next Operation
@@ -206,17 +230,17 @@ def process(file):
             operation_size = 0
             if operation.opcode is None:
                 pass
-            elif len(operation.format_list) is 0:
+            elif len(operation.format_list) == 0:
                 # operation_size must be calculated
                 if extended:
                     util.error("Operation is marked as extended, but extended version is not available...")
                     continue
                 else:
-                    if operation.name is "RESW":
+                    if operation.name == "RESW":
                         operation_size = int(operand) * 3
-                    elif operation.name is "RESB":
+                    elif operation.name == "RESB":
                         operation_size = int(operand)
-                    elif operation.name is "BYTE":
+                    elif operation.name == "BYTE":
                         literal = operand[1:].replace("'", '')
                         if operand[:1] == 'X':
                             if len(literal) % 2 == 0:
@@ -256,7 +280,23 @@ def process(file):
             # done processing a line of code to be assembled, increment lines counted
             lines_counted += 1
 
+    #
+    #   Size Operations
+    #   Once every memory location and label is known, operations are sized by their displacements
+    #
+    if optimize and success:
+        sizing.relax(lst)
+
+        # widened operations are now extended operations
+        for lst_item in lst:
+            if 'Meta' in lst_item and lst_item['Meta'].get('widened', False):
+                pass2.classify(lst_item['Meta'])
+
+    # labels since the last literal pool, and any moved by sizing
+    symbol_table.flush_symbols()
+
     return {
         "lst": lst,
-        "success": success
+        "success": success,
+        "included": included
     }
\ No newline at end of file
@@ -5,211 +5,389 @@
 #
 #   Pass 2 attempts to generate object codes for each line item in the lst file.
 #
-from lib import util, symbol_table
-import copy
+#   Pass 1 classifies each line once into a kind (see the classify function), and attaches the handler which
+#       generates the object code for that kind. Pass 2 calls the handler of each line in turn, rather than
+#       rediscovering what kind of line it is. New kinds of lines only need a handler and a rule in classify.
+#
+from lib import encoder, util, symbol_table
+
+
+#
+#   State Class
+#   Holds everything the handlers share while Pass 2 iterates over the lst record
+#
+class State:
+
+    def __init__(self, lst):
+        self.lst = lst
+        self.errors = []
+        self.success = True
+        self.program_counter = 0
+        self.base_address = None
+
+        # link information, written alongside the object code for the linker
+        self.program_name = None
+        self.program_start = 0
+        self.external_symbols = set()
+        self.definitions = []
+        self.modifications = []
+
+    # Error Function
+    # scraps the object code of a record, and adds an error after it
+    #
+    def error(self, record, message):
+        record['Object Code'] = '    '
+        util.add_lst_error(record['Line ID'], message, self.errors)
+        self.success = False
 
 
 #
 #   Process Function
 #   This function provides the starting point for the Pass 2
 #
-def process(lst):
-    success = True
-    program_counter = 0
-    base_address = None
-    new_lst = copy.deepcopy(lst)
-    j = 0
+#   lst - lst records generated by Pass 1, only iterated over once, so they may be streamed (see the spill module)
+#   output - where the new lst records are appended, a new list by default
+#
+def process(lst, output=None):
+    state = State(output if output is not None else [])
+    program_end = 0
 
     #
     #   Process Function
     #   We iterate over each line in the processed lst file to determine lines which need object code,
     #       and we generate the appropriate object code
     #
-    for i, lst_item in enumerate(lst):
+    #   Each record is copied into the new lst record, followed by any errors found for it
+    #
+    items = iter(lst)
+    lst_item = next(items, None)
+    while lst_item is not None:
+        next_item = next(items, None)
+        record = dict(lst_item)
 
         if 'Error' not in lst_item:
 
-            next_item = None
-            if i+1 is not len(lst):
-                next_item = lst[i+1]
-
             #
             #   Increment Program Counter
-            #   We must increase our Program Counter past our current memory location by the size of the next operation
-            #       and we generate the appropriate object code
+            #   We must increase our Program Counter past our current memory location by the size of the next
+            #       operation and we generate the appropriate object code
             #
             if next_item is not None and 'Location' in next_item and len(next_item['Location'].strip()) > 0:
-                program_counter = int(next_item['Location'], 16)
+                state.program_counter = int(next_item['Location'], 16)
 
-            meta = None
-            if lst_item['Meta'] is not None:
-                meta = lst_item['Meta']
+            meta = lst_item['Meta']
+            handler = meta.get('handler', None)
+            if handler is None:
+                handler = classify(meta)['handler']
 
-            #
-            #   Process Non-Object-Code Operations
-            #   We process Comments, erroneous operations and Base registration early
-            #
-            if meta.get('flag', None) == '-comm':
-                new_lst[j]['Object Code'] = ''
+            # fields which do not fit their operation are reported by the encoder
+            try:
+                handler(state, record, meta)
+            except ValueError as error:
+                state.error(record, str(error))
 
-            elif meta.get('flag', None) == '-notop':
-                new_lst[j]['Object Code'] = ''
-                util.add_lst_error(lst_item['Line ID'], "Unsupported opcode found in statement", new_lst, j+1)
-                j += 1
-                success = False
+        state.lst.append(record)
+        for error in state.errors:
+            state.lst.append(error)
+        del state.errors[:]
 
-            # Check for Base registration
-            elif meta.get('mneumonic', None) == 'BASE':
-                symbol_read = symbol_table.read_symbol(meta.get('operand', None))
-                if symbol_read['success']:
-                    base_address = int(symbol_read['tokens'][1], 16)
+        # the program ends after the last memory location, or the last object code
+        if 'Error' not in record and len(record['Location'].strip()) > 0:
+            end = int(record['Location'], 16) + len(record['Object Code'].strip()) // 2
+            program_end = max(program_end, end)
 
-            elif 'operation' in meta and meta['operation'].opcode is None:
-                new_lst[j]['Object Code'] = ''
+        lst_item = next_item
+
+    program_end = max(program_end, state.program_start)
 
-            #
-            #   Process Object-Code Operations
-            #   We process Operations which are likely to generate Object Code
-            #
-            elif meta is not None:
-
-                # Process RESW and RESB
-                if meta['mneumonic'] in ['RESW', 'RESB']:
-                    new_lst[j]['Object Code'] = ''
-
-                # Process BYTEs
-                elif meta['mneumonic'] == 'BYTE':
-                    literal = meta['operand'][1:].replace("'", '')
-                    if meta['operand'][:1] == 'X' or lst_item['Object Code'] == '-lithx':
-                        if len(literal) % 2 == 0:
-                            new_lst[j]['Object Code'] = literal
-                        else:
-                            new_lst[j]['Object Code'] = ''
-                            util.add_lst_error(lst_item['Line ID'], "Odd number of X bytes found in operand field: "
-                                               + meta['operand'], new_lst, j+1)
-                            j += 1
-                            success = False
-                    elif meta['operand'][:1] == 'C' or lst_item['Object Code'] == '-litch':
-                        new_lst[j]['Object Code'] = "".join([hex(ord(c))[2:] for c in literal])
-
-                # Process WORDs
-                elif meta['mneumonic'] == 'WORD':
-                    new_lst[j]['Object Code'] = util.hexized(meta['operand'], 6)
-
-                # Process generic operations with opcodes
-                else:
-                    opcode = int(meta['operation'].opcode, 16)
-                    register_operation = (2 in meta['operation'].format_list)
-
-                    # Process ni bits
-                    if meta['sic'] or register_operation:  # register-to-register operations and SIC operations
-                        ni_value = 0
-                    elif meta['addressing'] == '#':  # immediate addressing
-                        ni_value = 1
-                    elif meta['addressing'] == '@':  # indirect addressing
-                        ni_value = 2
-                    else:                            # most operations
-                        ni_value = 3
-
-                    new_lst[j]['Object Code'] = hex(opcode + ni_value)[2:].zfill(2)
-
-                    # Process xbpe bits
-                    # Here, we determine the addressing techniques used by the operation,
-                    #   and generate the appropriate object based on such
-                    xbpe_value = 0
-
-                    if meta['indexed']:
-                        xbpe_value = 8
-
-                    # SIC operations
-                    if meta['sic']:
-                        xbpe_value = 0
-                        symbol_read = symbol_table.read_symbol(meta['operand'])
-                        address = symbol_read['tokens'][1]
-
-                        # address is already hex
-                        new_lst[j]['Object Code'] += hex(xbpe_value)[2:] + str(address).zfill(3)
-
-                    # extended operations
-                    elif meta['extended']:
-                        xbpe_value += 1
-                        symbol_read = symbol_table.read_symbol(meta['operand'])
-                        address = symbol_read['tokens'][1].zfill(5)
-
-                        # address is already hex
-                        new_lst[j]['Object Code'] += hex(xbpe_value)[2:] + str(address).zfill(3)
-
-                    # register to register operations, no addressing necessary
-                    elif register_operation:
-                        registers = meta['operand'].split(',')
-                        address = ""
-                        if len(registers) > 0:
-                            address += util.lookup_register(registers[0])
-                        if len(registers) > 1:
-                            address += util.lookup_register(registers[1])
-                        else:
-                            address += "0"
-
-                        new_lst[j]['Object Code'] += str(address).zfill(2)  # register address is less than 9
-
-                    # process immediate addressing
-                    elif meta['addressing'] == '#':
-                        address = hex(int(meta['operand']))[2:]
-                        new_lst[j]['Object Code'] += str(address).zfill(4)  # address is already hex
-
-                    # process RSUB
-                    elif meta['mneumonic'] == 'RSUB':
-                        address = '0000'
-                        new_lst[j]['Object Code'] += str(address).zfill(4)  # address is already hex
-
-                    # start PC/Base relative operations
-                    else:
-                        symbol_read = symbol_table.read_symbol(meta['operand'])
-                        if symbol_read['success']:
-                            if 'tokens' in symbol_read:
-                                if len(symbol_read['tokens']) > 1:
-                                    xbpe_value += 2
-
-                                    # calculate relative address
-                                    address = int(symbol_read['tokens'][1], 16) - program_counter
-
-                                    # is positive PC relative
-                                    if 0 <= address < 2048:
-                                        new_lst[j]['Object Code'] += hex(xbpe_value)[2:] + hex(address)[2:].zfill(3)
-                                    # is negative PC relative
-                                    elif -2048 <= address < 0:
-                                        new_lst[j]['Object Code'] += hex(xbpe_value)[2:] + util.hexized(address, 3)
-                                    # is Base relative
-                                    else:
-                                        if base_address:
-                                            xbpe_value += 2
-                                            address = int(symbol_read['tokens'][1], 16) - base_address
-                                            if 0 <= address <= 4097:
-                                                new_lst[j]['Object Code'] += hex(xbpe_value)[2:] + util.hexized(address, 3)
-                                            else:
-                                                new_lst[j]['Object Code'] = ''
-                                                util.add_lst_error(lst_item['Line ID'], "Address out of range, no BASE...", new_lst, j+1)
-                                                j += 1
-                                                success = False
-                                        else:
-                                            new_lst[j]['Object Code'] = ''
-                                            util.add_lst_error(lst_item['Line ID'], "Address out of range, no BASE...", new_lst, j+1)
-                                            j += 1
-                                            success = False
-                        else:
-                            new_lst[j]['Object Code'] = ''
-                            util.add_lst_error(lst_item['Line ID'], symbol_read['message'], new_lst, j+1)
-                            j += 1
-                            success = False
-
-                # clean up Object Code output, uppercase with all white space to the right
-                if 'Error' not in new_lst[j]:
-                    new_lst[j]['Object Code'] = new_lst[j]['Object Code'].strip().upper().ljust(8)
-
-        j += 1
-
-    del lst
     return {
-        "lst": new_lst,
-        "success": success
-    }
\ No newline at end of file
+        "lst": state.lst,
+        "success": state.success,
+        "link": {
+            "name": state.program_name,
+            "start": state.program_start,
+            "length": program_end - state.program_start,
+            "definitions": state.definitions,
+            "references": sorted(state.external_symbols),
+            "modifications": state.modifications
+        }
+    }
+
+
+#
+#   Classify Function
+#   Determines the kind of a line from its meta information, attaching the kind and its handler to the meta
+#
+#   meta - meta information for the lst record, as generated by Pass 1
+#
+def classify(meta):
+    flag = meta.get('flag', None)
+    operation = meta.get('operation', None)
+
+    if flag == '-comm':
+        kind = 'comment'
+    elif flag == '-notop':
+        kind = 'unsupported'
+    elif meta['mneumonic'] in ['BASE', 'NOBASE', 'START', 'EXTREF', 'EXTDEF']:
+        kind = meta['mneumonic'].lower()
+    elif operation.opcode is None:
+        kind = 'directive'
+    elif meta['mneumonic'] in ['RESW', 'RESB']:
+        kind = 'reserve'
+    elif meta['mneumonic'] == 'BYTE':
+        kind = 'byte'
+    elif meta['mneumonic'] == 'WORD':
+        kind = 'word'
+    elif operation.format_list == [1]:
+        kind = 'format1'
+    elif meta['sic']:
+        kind = 'sic'
+    elif meta['extended']:
+        kind = 'extended'
+    elif 2 in operation.format_list:
+        kind = 'register'
+    elif meta['addressing'] == '#' and util.is_number(meta['operand']):
+        kind = 'immediate'
+    elif meta['mneumonic'] == 'RSUB':
+        kind = 'rsub'
+    else:
+        kind = 'relative'
+
+    meta['kind'] = kind
+    meta['handler'] = handlers[kind]
+    return meta
+
+
+#
+#   Ni Bits Function
+#   Determines the n and i flags of an operation from its addressing method
+#
+def ni_bits(meta):
+    if meta['sic'] or 2 in meta['operation'].format_list:  # register-to-register operations and SIC operations
+        return encoder.NI_SIC
+    elif meta['addressing'] == '#':  # immediate addressing
+        return encoder.NI_IMMEDIATE
+    elif meta['addressing'] == '@':  # indirect addressing
+        return encoder.NI_INDIRECT
+    else:                            # most operations
+        return encoder.NI_SIMPLE
+
+
+#
+#   X Bit Function
+#   Determines the x flag of an operation, the b, p and e flags are added by each handler
+#
+def x_bit(meta):
+    return encoder.X if meta['indexed'] else 0
+
+
+#
+#   Set Object Code Function
+#   Formats an encoded operation as the object code of a record
+#
+def set_object_code(record, encoded):
+    record['Object Code'] = encoder.to_hex(*encoded).ljust(8)
+
+
+#
+#   Process Non-Object-Code Operations
+#   We process Comments, erroneous operations, Base registration and other directives
+#
+
+def process_comment(state, record, meta):
+    record['Object Code'] = ''
+
+
+def process_unsupported(state, record, meta):
+    state.error(record, "Unsupported opcode found in statement")
+
+
+def process_directive(state, record, meta):
+    record['Object Code'] = ''
+
+
+# Check for Base registration
+def process_base(state, record, meta):
+    symbol_read = symbol_table.read_symbol(meta.get('operand', None))
+    if symbol_read['success']:
+        state.base_address = int(symbol_read['tokens'][1], 16)
+
+
+# Base relative addressing is no longer available
+def process_nobase(state, record, meta):
+    record['Object Code'] = ''
+    state.base_address = None
+
+
+# Check for program name and start, used to relocate the program when linked
+def process_start(state, record, meta):
+    record['Object Code'] = ''
+    state.program_name = meta['label'] if len(meta['label']) > 0 else None
+    state.program_start = int(record['Location'], 16)
+
+
+# Check for symbols imported from other programs, resolved by the linker
+def process_extref(state, record, meta):
+    record['Object Code'] = ''
+    state.external_symbols.update(meta['operand'].split(','))
+
+
+# Check for symbols exported to other programs
+def process_extdef(state, record, meta):
+    record['Object Code'] = ''
+    for symbol in meta['operand'].split(','):
+        symbol_read = symbol_table.read_symbol(symbol)
+        if symbol_read['success']:
+            state.definitions.append((symbol, int(symbol_read['tokens'][1], 16)))
+        else:
+            state.error(record, "Undefined external definition: " + symbol)
+            break
+
+
+#
+#   Process Data
+#   RESW and RESB reserve memory, BYTEs and WORDs (along with literals) are written as-is
+#
+
+def process_reserve(state, record, meta):
+    record['Object Code'] = ''
+
+
+def process_byte(state, record, meta):
+    literal = meta['operand'][1:].replace("'", '')
+    if meta['operand'][:1] == 'X':
+        if len(literal) % 2 == 0:
+            record['Object Code'] = literal.upper().ljust(8)
+        else:
+            state.error(record, "Odd number of X bytes found in operand field: " + meta['operand'])
+    elif meta['operand'][:1] == 'C':
+        record['Object Code'] = "".join([hex(ord(c))[2:] for c in literal]).upper().ljust(8)
+
+
+def process_word(state, record, meta):
+    record['Object Code'] = util.hexized(meta['operand'], 6).upper().ljust(8)
+
+
+#
+#   Process Operations
+#   Operations are packed into an integer by the encoder, then formatted once
+#
+
+def process_format1(state, record, meta):
+    set_object_code(record, encoder.encode_format1(int(meta['operation'].opcode, 16)))
+
+
+# SIC operations, the 15 bit address follows the x flag, and is relocated along with the program
+def process_sic(state, record, meta):
+    symbol_read = symbol_table.read_symbol(meta['operand'])
+    if symbol_read['success']:
+        set_object_code(record, encoder.encode_sic(int(meta['operation'].opcode, 16), meta['indexed'],
+                                                   int(symbol_read['tokens'][1], 16)))
+        state.modifications.append((int(record['Location'], 16) + 1, 4, None, 15))
+    else:
+        state.error(record, symbol_read['message'])
+
+
+# extended operations
+def process_extended(state, record, meta):
+    opcode = int(meta['operation'].opcode, 16)
+    ni_value = ni_bits(meta)
+    xbpe_value = x_bit(meta)
+
+    # external addresses are left for the linker to fill, internal addresses are relocated
+    if meta['operand'] in state.external_symbols:
+        set_object_code(record, encoder.encode_format4(opcode, ni_value, xbpe_value, 0))
+        state.modifications.append((int(record['Location'], 16) + 1, 5, meta['operand'], 20))
+    elif meta['addressing'] == '#' and util.is_number(meta['operand']):
+        set_object_code(record, encoder.encode_format4(opcode, ni_value, xbpe_value, int(meta['operand'])))
+    else:
+        symbol_read = symbol_table.read_symbol(meta['operand'])
+        if symbol_read['success']:
+            address = int(symbol_read['tokens'][1], 16)
+            set_object_code(record, encoder.encode_format4(opcode, ni_value, xbpe_value, address))
+            state.modifications.append((int(record['Location'], 16) + 1, 5, None, 20))
+        else:
+            state.error(record, symbol_read['message'])
+
+
+# register to register operations, no addressing necessary
+def process_register(state, record, meta):
+    registers = meta['operand'].split(',')
+    r1 = int(util.lookup_register(registers[0]))
+    r2 = 0
+    if len(registers) > 1:
+        r2 = int(util.lookup_register(registers[1]))
+
+    set_object_code(record, encoder.encode_format2(int(meta['operation'].opcode, 16), r1, r2))
+
+
+# process immediate addressing
+def process_immediate(state, record, meta):
+    value = int(meta['operand'])
+    if -2048 <= value < 4096:
+        set_object_code(record, encoder.encode_format3(int(meta['operation'].opcode, 16), ni_bits(meta),
+                                                       x_bit(meta), value))
+    else:
+        state.error(record, "Immediate value out of range, use format 4: " + meta['operand'])
+
+
+# process RSUB
+def process_rsub(state, record, meta):
+    set_object_code(record, encoder.encode_format3(int(meta['operation'].opcode, 16), ni_bits(meta), 0, 0))
+
+
+# start PC/Base relative operations
+def process_relative(state, record, meta):
+
+    # external symbols can only be reached by format 4
+    if meta['operand'] in state.external_symbols:
+        state.error(record, "External reference requires format 4: " + meta['operand'])
+        return
+
+    symbol_read = symbol_table.read_symbol(meta['operand'])
+    if not symbol_read['success']:
+        state.error(record, symbol_read['message'])
+        return
+
+    opcode = int(meta['operation'].opcode, 16)
+    target = int(symbol_read['tokens'][1], 16)
+
+    # calculate relative address
+    address = target - state.program_counter
+
+    # is PC relative
+    if -2048 <= address < 2048:
+        set_object_code(record, encoder.encode_format3(opcode, ni_bits(meta), x_bit(meta) | encoder.P, address))
+        return
+
+    # is Base relative
+    if state.base_address:
+        address = target - state.base_address
+        if 0 <= address < 4096:
+            set_object_code(record, encoder.encode_format3(opcode, ni_bits(meta), x_bit(meta) | encoder.B, address))
+            return
+
+    state.error(record, "Address out of range, no BASE...")
+
+
+# handlers for each kind of line, see the classify function
+handlers = {
+    'comment': process_comment,
+    'unsupported': process_unsupported,
+    'directive': process_directive,
+    'base': process_base,
+    'nobase': process_nobase,
+    'start': process_start,
+    'extref': process_extref,
+    'extdef': process_extdef,
+    'reserve': process_reserve,
+    'byte': process_byte,
+    'word': process_word,
+    'format1': process_format1,
+    'sic': process_sic,
+    'extended': process_extended,
+    'register': process_register,
+    'immediate': process_immediate,
+    'rsub': process_rsub,
+    'relative': process_relative
+}
@@ -0,0 +1,403 @@
+#
+#
+#   Simulator
+#   The Simulator executes assembled SIC/XE object code, so programs can be tested without an external emulator.
+#
+#   Object code is loaded into a 1 megabyte memory, the address space of SIC/XE. Registers are numbered as the
+#       assembler numbers them (see util.lookup_register).
+#
+#   Operations are decoded once into a cache keyed by memory location. Each cached entry holds the handler for the
+#       operation along with everything about its operand which does not change between executions, so loops only
+#       pay for decoding on their first pass. Entries are dropped when the memory holding them is written.
+#
+#   Floating point, privileged and I/O channel operations are not supported.
+#
+#
+
+from lib import encoder, util, objfile
+import time
+
+__author__ = 'Nicholas Pickering'
+
+MEMORY_SIZE = 1 << 20
+
+# Register numbers, as assembled into format 2 operations
+A = int(util.lookup_register('A'))
+X = int(util.lookup_register('X'))
+L = int(util.lookup_register('L'))
+B = int(util.lookup_register('B'))
+S = int(util.lookup_register('S'))
+T = int(util.lookup_register('T'))
+F = int(util.lookup_register('F'))
+PC = int(util.lookup_register('PC'))
+SW = int(util.lookup_register('SW'))
+
+# Addressing modes, from the n and i flags
+SIC = encoder.NI_SIC
+IMMEDIATE = encoder.NI_IMMEDIATE
+INDIRECT = encoder.NI_INDIRECT
+SIMPLE = encoder.NI_SIMPLE
+
+
+#   Signed Function
+#   Interprets a 24 bit word as a signed integer
+#
+#   value - word to interpret
+def signed(value):
+    value &= 0xFFFFFF
+    if value & 0x800000:
+        return value - 0x1000000
+    return value
+
+
+# Simulator class
+# The Simulator class holds the memory, registers and decoded operation cache of a running SIC/XE program
+#
+class Simulator:
+
+    def __init__(self, memory_size=MEMORY_SIZE):
+        self.memory = bytearray(memory_size)
+        self.registers = [0] * 10
+        self.cache = dict()
+        self.start_address = 0
+        self.input = b''
+        self.input_position = 0
+        self.output = dict()
+        self.message = None
+
+        # returning to the initial value of the linkage register ends the program
+        self.return_address = memory_size
+        self.registers[L] = self.return_address
+
+        self.handlers = {
+            'ADD': self.op_add, 'AND': self.op_and, 'COMP': self.op_comp, 'DIV': self.op_div,
+            'J': self.op_j, 'JEQ': self.op_jeq, 'JGT': self.op_jgt, 'JLT': self.op_jlt, 'JSUB': self.op_jsub,
+            'LDA': self.op_load, 'LDB': self.op_load, 'LDL': self.op_load, 'LDS': self.op_load,
+            'LDT': self.op_load, 'LDX': self.op_load, 'LDCH': self.op_ldch, 'MUL': self.op_mul, 'OR': self.op_or,
+            'RD': self.op_rd, 'RSUB': self.op_rsub, 'STA': self.op_store, 'STB': self.op_store,
+            'STL': self.op_store, 'STS': self.op_store, 'STSW': self.op_store, 'STT': self.op_store,
+            'STX': self.op_store, 'STCH': self.op_stch, 'SUB': self.op_sub, 'TD': self.op_td, 'TIX': self.op_tix,
+            'WD': self.op_wd, 'ADDR': self.op_addr, 'CLEAR': self.op_clear, 'COMPR': self.op_compr,
+            'DIVR': self.op_divr, 'MULR': self.op_mulr, 'RMO': self.op_rmo, 'SHIFTL': self.op_shiftl,
+            'SHIFTR': self.op_shiftr, 'SUBR': self.op_subr, 'TIXR': self.op_tixr
+        }
+
+        # register affected by each load and store operation
+        self.operation_registers = {
+            'LDA': A, 'LDB': B, 'LDL': L, 'LDS': S, 'LDT': T, 'LDX': X,
+            'STA': A, 'STB': B, 'STL': L, 'STS': S, 'STSW': SW, 'STT': T, 'STX': X
+        }
+
+    #
+    #   Load Object Function
+    #   loads an obj file written by the assembler into memory
+    #
+    #   file - open obj file
+    #
+    def load_object(self, file):
+        obj = objfile.read_object(file)
+        for section in obj['sections']:
+            location = section['address']
+            for record in section['records']:
+                record_bytes = bytes.fromhex(record)
+                self.write_memory(location, record_bytes)
+                location += len(record_bytes)
+
+        self.start_address = obj['start']
+
+    #
+    #   Load Image Function
+    #   loads raw object code into memory
+    #
+    #   data - bytes to load
+    #   address - memory location to load the bytes at, which is also the start address of the program
+    #
+    def load_image(self, data, address=0):
+        self.write_memory(address, data)
+        self.start_address = address
+
+    #
+    #   Write Memory Function
+    #   writes bytes into memory, dropping any decoded operations they overlap
+    #
+    def write_memory(self, address, data):
+        self.memory[address:address + len(data)] = data
+        if self.cache:
+            for cached_address in range(address - 3, address + len(data)):
+                self.cache.pop(cached_address, None)
+
+    def read_word(self, address):
+        memory = self.memory
+        return (memory[address] << 16) | (memory[address + 1] << 8) | memory[address + 2]
+
+    def write_word(self, address, value):
+        self.write_memory(address, (value & 0xFFFFFF).to_bytes(3, 'big'))
+
+    #
+    #   Decode Function
+    #   decodes the operation at a memory location into a cache entry
+    #
+    #   An entry is a tuple of:
+    #       handler, operation, location of the next operation, addressing mode, target address,
+    #       base relative flag, indexed flag, and the two registers of a format 2 operation
+    #
+    #   The target address holds the displacement, or the absolute address, and is already PC relative where
+    #       needed, since the program counter of an operation never changes.
+    #
+    def decode(self, address):
+        decoded = encoder.decode(self.memory, address)
+        if decoded is None:
+            return None
+
+        operation = decoded['operation']
+        handler = self.handlers.get(operation.name, self.op_unsupported)
+        next_address = address + decoded['length']
+        xbpe = decoded['xbpe']
+        target = decoded['field']
+        r1 = decoded['r1']
+        r2 = decoded['r2']
+        mode = decoded['ni'] if decoded['format'] >= 3 else SIMPLE
+        base_relative = False
+        indexed = (xbpe & encoder.X) != 0
+
+        if decoded['format'] == 3 and mode != SIC:
+            if xbpe & encoder.P:
+                target = encoder.signed_displacement(target) + next_address
+            elif xbpe & encoder.B:
+                base_relative = True
+
+        entry = (handler, operation, next_address, mode, target, base_relative, indexed, r1, r2)
+        self.cache[address] = entry
+        return entry
+
+    #
+    #   Run Function
+    #   executes the program from its start address
+    #
+    #   max_steps - number of operations to execute before giving up on the program
+    #
+    #   This function may return True or False to denote success and failure, along with a message
+    #       to provide additional information about why the program stopped.
+    #
+    #   This function also returns the number of operations executed and the time taken to execute them.
+    #
+    def run(self, max_steps=1000000):
+        registers = self.registers
+        cache = self.cache
+        program_counter = self.start_address
+        steps = 0
+        self.message = None
+        success = True
+
+        started = time.perf_counter()
+        while steps < max_steps:
+            entry = cache.get(program_counter)
+            if entry is None:
+                if program_counter < 0 or program_counter + 4 > len(self.memory):
+                    self.message = "Program counter out of memory at " + util.hexized(program_counter, 6).upper()
+                    success = False
+                    break
+
+                entry = self.decode(program_counter)
+                if entry is None:
+                    self.message = "Invalid opcode at " + util.hexized(program_counter, 6).upper()
+                    success = False
+                    break
+
+            registers[PC] = entry[2]
+            try:
+                entry[0](entry)
+            except IndexError:
+                self.message = "Memory access out of range"
+            steps += 1
+
+            if self.message is not None:
+                self.message += " at " + util.hexized(program_counter, 6).upper()
+                success = False
+                break
+
+            # a jump to itself, or a return from the program, ends the program
+            next_counter = registers[PC]
+            if next_counter == program_counter:
+                self.message = "Halted at " + util.hexized(program_counter, 6).upper()
+                break
+            if next_counter == self.return_address:
+                self.message = "Returned from program"
+                break
+
+            program_counter = next_counter
+        else:
+            self.message = "Stopped after " + str(max_steps) + " operations"
+            success = False
+
+        elapsed = time.perf_counter() - started
+        return {
+            'success': success,
+            'message': self.message,
+            'steps': steps,
+            'elapsed': elapsed,
+            'ips': steps / elapsed if elapsed > 0 else 0.0
+        }
+
+    #
+    #   Operand Functions
+    #   resolve the operand of a format 3/4 operation according to its addressing mode
+    #
+    def target_address(self, entry):
+        target = entry[4]
+        if entry[5]:
+            target += self.registers[B]
+        if entry[6]:
+            target += self.registers[X]
+        target &= 0xFFFFF
+
+        # indirect addressing holds the address of the operand
+        if entry[3] == INDIRECT:
+            target = self.read_word(target) & 0xFFFFF
+        return target
+
+    def operand_value(self, entry):
+        if entry[3] == IMMEDIATE:
+            return self.target_address(entry)
+        return self.read_word(self.target_address(entry))
+
+    def operand_byte(self, entry):
+        if entry[3] == IMMEDIATE:
+            return self.target_address(entry) & 0xFF
+        return self.memory[self.target_address(entry)]
+
+    def compare(self, first, second):
+        first = signed(first)
+        second = signed(second)
+        self.registers[SW] = (first > second) - (first < second)
+
+    #
+    #   Operation Handlers
+    #   execute a single decoded operation
+    #
+    def op_load(self, entry):
+        self.registers[self.operation_registers[entry[1].name]] = self.operand_value(entry)
+
+    def op_store(self, entry):
+        self.write_word(self.target_address(entry), self.registers[self.operation_registers[entry[1].name]])
+
+    def op_ldch(self, entry):
+        self.registers[A] = (self.registers[A] & 0xFFFF00) | self.operand_byte(entry)
+
+    def op_stch(self, entry):
+        self.write_memory(self.target_address(entry), bytes([self.registers[A] & 0xFF]))
+
+    def op_add(self, entry):
+        self.registers[A] = (self.registers[A] + self.operand_value(entry)) & 0xFFFFFF
+
+    def op_sub(self, entry):
+        self.registers[A] = (self.registers[A] - self.operand_value(entry)) & 0xFFFFFF
+
+    def op_mul(self, entry):
+        self.registers[A] = (signed(self.registers[A]) * signed(self.operand_value(entry))) & 0xFFFFFF
+
+    def op_div(self, entry):
+        self.registers[A] = self.divide(self.registers[A], self.operand_value(entry))
+
+    def op_and(self, entry):
+        self.registers[A] &= self.operand_value(entry)
+
+    def op_or(self, entry):
+        self.registers[A] |= self.operand_value(entry)
+
+    def op_comp(self, entry):
+        self.compare(self.registers[A], self.operand_value(entry))
+
+    def op_tix(self, entry):
+        self.registers[X] = (self.registers[X] + 1) & 0xFFFFFF
+        self.compare(self.registers[X], self.operand_value(entry))
+
+    def op_j(self, entry):
+        self.registers[PC] = self.target_address(entry)
+
+    def op_jeq(self, entry):
+        if self.registers[SW] == 0:
+            self.registers[PC] = self.target_address(entry)
+
+    def op_jgt(self, entry):
+        if self.registers[SW] > 0:
+            self.registers[PC] = self.target_address(entry)
+
+    def op_jlt(self, entry):
+        if self.registers[SW] < 0:
+            self.registers[PC] = self.target_address(entry)
+
+    def op_jsub(self, entry):
+        self.registers[L] = self.registers[PC]
+        self.registers[PC] = self.target_address(entry)
+
+    def op_rsub(self, entry):
+        self.registers[PC] = self.registers[L]
+
+    def op_td(self, entry):
+        # devices are always ready
+        self.operand_byte(entry)
+        self.registers[SW] = -1
+
+    def op_rd(self, entry):
+        # every device reads from the same input, reading past its end reads zeros
+        self.operand_byte(entry)
+        value = 0
+        if self.input_position < len(self.input):
+            value = self.input[self.input_position]
+            self.input_position += 1
+        self.registers[A] = (self.registers[A] & 0xFFFF00) | value
+
+    def op_wd(self, entry):
+        device = self.operand_byte(entry)
+        self.output.setdefault(device, bytearray()).append(self.registers[A] & 0xFF)
+
+    def op_addr(self, entry):
+        self.registers[entry[8]] = (self.registers[entry[8]] + self.registers[entry[7]]) & 0xFFFFFF
+
+    def op_subr(self, entry):
+        self.registers[entry[8]] = (self.registers[entry[8]] - self.registers[entry[7]]) & 0xFFFFFF
+
+    def op_mulr(self, entry):
+        self.registers[entry[8]] = (signed(self.registers[entry[8]]) * signed(self.registers[entry[7]])) & 0xFFFFFF
+
+    def op_divr(self, entry):
+        self.registers[entry[8]] = self.divide(self.registers[entry[8]], self.registers[entry[7]])
+
+    def op_compr(self, entry):
+        self.compare(self.registers[entry[7]], self.registers[entry[8]])
+
+    def op_clear(self, entry):
+        self.registers[entry[7]] = 0
+
+    def op_rmo(self, entry):
+        self.registers[entry[8]] = self.registers[entry[7]]
+
+    def op_shiftl(self, entry):
+        # the shift count is assembled as one less than the count written
+        count = (entry[8] + 1) % 24
+        value = self.registers[entry[7]] & 0xFFFFFF
+        self.registers[entry[7]] = ((value << count) | (value >> (24 - count))) & 0xFFFFFF
+
+    def op_shiftr(self, entry):
+        count = entry[8] + 1
+        self.registers[entry[7]] = (signed(self.registers[entry[7]]) >> count) & 0xFFFFFF
+
+    def op_tixr(self, entry):
+        self.registers[X] = (self.registers[X] + 1) & 0xFFFFFF
+        self.compare(self.registers[X], self.registers[entry[7]])
+
+    def op_unsupported(self, entry):
+        self.message = "Unsupported operation " + entry[1].name
+
+    def divide(self, dividend, divisor):
+        dividend = signed(dividend)
+        divisor = signed(divisor)
+        if divisor == 0:
+            self.message = "Division by zero"
+            return dividend & 0xFFFFFF
+
+        quotient = abs(dividend) // abs(divisor)
+        if (dividend < 0) != (divisor < 0):
+            quotient = -quotient
+        return quotient & 0xFFFFFF
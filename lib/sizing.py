@@ -0,0 +1,266 @@
+#
+#   Sizing
+#   Sizing selects the smallest format for each format 3/4 operation once Pass 1 has assigned memory locations.
+#
+#   Every operation which may be assembled as either format 3 or format 4 starts out as format 3. If the
+#       displacement to its operand cannot be reached PC relative or Base relative, the operation is widened to
+#       format 4, which moves every memory location after it by one byte.
+#
+#   Moving memory locations may push other displacements out of range, so widened operations are tracked on a
+#       worklist until no operation needs to be widened (a fixpoint). Operations only ever grow, so the fixpoint is
+#       always reached.
+#
+#   Operations referring to an external symbol (EXTREF) are always widened, since only the linker can resolve them.
+#       Immediate values out of the range of format 3 are always widened too, since they never move.
+#
+#   The span of an operation runs from its target to its program counter (or base address). Spans are kept in a
+#       Span Index, so widening an operation only finds the spans crossing it, rather than checking every operation.
+#
+from lib import symbol_table, util
+from collections import deque
+import bisect
+
+
+#
+#   Relax Function
+#   Widens format 3 operations to format 4 where their displacement is out of range
+#
+#   lst - list of lst records generated by Pass 1, updated in place along with the symbol table
+#
+#   Returns the number of operations widened to format 4
+#
+def relax(lst):
+    candidates = []
+    externals = set()
+    program_counter = 0
+    base_address = None
+
+    # widened holds the original location of each widened operation, so a location moves by the number of
+    #   widened operations located before it
+    widened = []
+
+    def shift(value):
+        return value + bisect.bisect_left(widened, value)
+
+    def widen(meta, location):
+        meta['extended'] = True
+        meta['widened'] = True
+        bisect.insort(widened, location)
+
+    #
+    #   Collect Candidates
+    #   Operations are collected with the original memory locations Pass 2 will use to calculate their displacement:
+    #       the target address, the program counter, and the base address in effect.
+    #
+    for i, lst_item in enumerate(lst):
+        if 'Error' in lst_item:
+            continue
+
+        # Mirror the Program Counter as Pass 2 will calculate it
+        if i+1 != len(lst):
+            next_item = lst[i+1]
+            if 'Location' in next_item and len(next_item['Location'].strip()) > 0:
+                program_counter = int(next_item['Location'], 16)
+
+        meta = lst_item['Meta']
+        if meta.get('flag', None) is not None:
+            continue
+
+        if meta['mneumonic'] == 'BASE':
+            base_address = None
+            symbol_read = symbol_table.read_symbol(meta['operand'])
+            if symbol_read['success'] and int(symbol_read['tokens'][1], 16) > 0:
+                base_address = int(symbol_read['tokens'][1], 16)
+            continue
+
+        if meta['mneumonic'] == 'NOBASE':
+            base_address = None
+            continue
+
+        if meta['mneumonic'] == 'EXTREF':
+            externals.update(meta['operand'].split(','))
+            continue
+
+        if not is_candidate(meta):
+            continue
+
+        # External references are resolved by the linker, which requires the 20 bit address of format 4
+        if meta['operand'] in externals:
+            widen(meta, int(lst_item['Location'], 16))
+            continue
+
+        # Immediate values are not displacements, so only their value decides their format
+        if meta['addressing'] == '#' and util.is_number(meta['operand']):
+            if not -2048 <= int(meta['operand']) < 4096:
+                widen(meta, int(lst_item['Location'], 16))
+            continue
+
+        symbol_read = symbol_table.read_symbol(meta['operand'])
+        if not symbol_read['success']:
+            continue
+
+        candidates.append({
+            'meta': meta,
+            'location': int(lst_item['Location'], 16),
+            'target': int(symbol_read['tokens'][1], 16),
+            'program_counter': program_counter,
+            'base': base_address
+        })
+
+    #
+    #   Widen to a Fixpoint
+    #   Every candidate is checked once, and again only when a widened operation moves its displacement
+    #
+    index = SpanIndex(candidates)
+    worklist = deque(candidates)
+    for candidate in candidates:
+        candidate['queued'] = True
+
+    while worklist:
+        candidate = worklist.popleft()
+        candidate['queued'] = False
+
+        if candidate['meta']['extended']:
+            continue
+
+        if fits(candidate, shift):
+            index.restore(candidate)
+            continue
+
+        location = candidate['location']
+        widen(candidate['meta'], location)
+
+        # Only operations whose span crosses the widened operation need to be checked again
+        for other in index.crossing(location):
+            if not other['queued']:
+                other['queued'] = True
+                index.remove(other)
+                worklist.append(other)
+
+    #
+    #   Apply New Locations
+    #   Memory locations of the lst records and the symbol table are moved past the widened operations
+    #
+    if len(widened) > 0:
+        for lst_item in lst:
+            if 'Location' not in lst_item or len(lst_item['Location'].strip()) == 0:
+                continue
+
+            # unsupported operations keep the placeholder given by Pass 1, which is not a memory location
+            if lst_item['Meta'].get('flag', None) == '-notop':
+                continue
+
+            lst_item['Location'] = hex(shift(int(lst_item['Location'], 16)))[2:].zfill(5).upper()
+
+        for label, value in symbol_table.list_symbols():
+            symbol_table.update_symbol(label, shift(value))
+
+    return len(widened)
+
+
+#
+#   Is Candidate Function
+#   Determines if an operation's format is chosen by its displacement, or by its immediate value
+#
+#   meta - meta information for the lst record, as generated by Pass 1
+#
+def is_candidate(meta):
+    operation = meta['operation']
+    return operation is not None and operation.format_list == [3, 4] and not meta['extended'] \
+        and not meta['sic'] and meta['mneumonic'] != 'RSUB' and len(meta['operand']) > 0
+
+
+#
+#   Fits Function
+#   Determines if an operation's operand can be reached by a format 3 displacement
+#
+#   candidate - operation collected by the relax function
+#   shift - function moving an original memory location past the widened operations
+#
+def fits(candidate, shift):
+    target = shift(candidate['target'])
+
+    if -2048 <= target - shift(candidate['program_counter']) < 2048:
+        return True
+
+    if candidate['base'] is not None:
+        return 0 <= target - shift(candidate['base']) < 4096
+
+    return False
+
+
+#
+#   Span Index Class
+#   The spans of the candidates, sorted by their lowest location, under a tree holding the highest location of the
+#       spans beneath each node. A span crosses a widened operation if it starts at or before the operation and
+#       ends after it, so only the branches holding such a span are searched.
+#
+#   Spans of candidates waiting on the worklist, or already widened, are left out of the tree, so each widening
+#       only finds the candidates it re-queues.
+#
+class SpanIndex:
+
+    def __init__(self, candidates):
+        spans = []
+        for candidate in candidates:
+            candidate['spans'] = []
+            for other in (candidate['program_counter'], candidate['base']):
+                if other is not None and other != candidate['target']:
+                    spans.append((min(other, candidate['target']), max(other, candidate['target']), candidate))
+        spans.sort(key=lambda span: span[0])
+
+        self.lows = [span[0] for span in spans]
+        self.highs = [span[1] for span in spans]
+        self.owners = [span[2] for span in spans]
+        for position, span in enumerate(spans):
+            span[2]['spans'].append(position)
+
+        # every candidate starts on the worklist, so the tree starts empty
+        self.size = 1
+        while self.size < len(spans):
+            self.size *= 2
+        self.tree = [-1] * (2 * self.size)
+
+    # Crossing Function
+    # candidates with a span crossing the location, once for each span
+    #
+    def crossing(self, location):
+        limit = bisect.bisect_right(self.lows, location)
+        found = []
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, start, end = stack.pop()
+            if start >= limit or self.tree[node] <= location:
+                continue
+            if node >= self.size:
+                found.append(self.owners[node - self.size])
+                continue
+            middle = (start + end) // 2
+            stack.append((2 * node, start, middle))
+            stack.append((2 * node + 1, middle, end))
+        return found
+
+    # Remove Function
+    # leaves the spans of a candidate out of the tree
+    #
+    def remove(self, candidate):
+        for position in candidate['spans']:
+            self.set(position, -1)
+
+    # Restore Function
+    # puts the spans of a candidate back in the tree
+    #
+    def restore(self, candidate):
+        for position in candidate['spans']:
+            self.set(position, self.highs[position])
+
+    # Set Function
+    # sets the highest location of a span, and of every node above it
+    #
+    def set(self, position, high):
+        node = position + self.size
+        self.tree[node] = high
+        node //= 2
+        while node > 0:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
@@ -0,0 +1,134 @@
+#
+#
+#   Source
+#   This module reads a SIC/XE program and breaks each of its lines up into tokens for Pass 1
+#
+#   Source lines are fixed column:
+#       columns 1-7     label
+#       column 10       + for extended operations, * for SIC operations
+#       columns 11-16   mneumonic
+#       column 19       addressing method, # for immediate, @ for indirect, = for literals
+#       columns 20-28   operand
+#
+#   Lines may be read from an open text file, or from bytes already in memory.
+#
+#   Each line is produced as a tuple of its source and its tokens. Tokens are None for comments, and blank lines
+#       are skipped.
+#
+#
+
+
+#
+#   Read Lines Function
+#   tokenizes each line of an open text file
+#
+#   file - open file containing the SIC/XE program
+#
+def read_lines(file):
+    for line in file:
+        line = line.replace("\n", "")
+
+        # Check for blank lines, if so skip
+        if "".join(line.split()) == "":
+            continue
+
+        # Check if line is a comment
+        if line[0] == '.':
+            yield line, None
+            continue
+
+        label = line[:7].replace(" ", "")
+
+        extended = False
+        sic = False
+        if len(line) > 9:
+            extended = line[9] == "+"
+            sic = line[9] == "*"
+
+        mneumonic = line[10:16].replace(" ", "")
+
+        addressing = ""
+        if len(line) > 18:
+            addressing = line[18]
+
+        symbols = []
+        if mneumonic in ["EXTDEF", "EXTREF", "COPY"]:
+            symbols = line[19:].split()
+
+        yield line, tokenize_operand(label, mneumonic, line[19:28].replace(" ", ""), symbols,
+                                     extended, sic, addressing)
+
+
+#
+#   Buffer Lines Function
+#   tokenizes each line of a program already read into memory as bytes
+#
+#   data - bytes of the file containing the SIC/XE program
+#   keep_source - if not set, the source of each line is not decoded and produced as None
+#
+def buffer_lines(data, keep_source=True):
+    for line in data.split(b"\n"):
+        tokens = tokenize_bytes(line.rstrip(b"\r"), keep_source)
+        if tokens is not None:
+            yield tokens
+
+
+#
+#   Tokenize Bytes Function
+#   tokenizes a single line of bytes, returning None for blank lines
+#
+#   line - bytes of the line, without its line ending
+#   keep_source - if not set, the source of the line is not decoded and produced as None
+#
+def tokenize_bytes(line, keep_source=True):
+
+    # Check for blank lines, if so skip
+    if len(line) == 0 or line.isspace():
+        return None
+
+    # Check if line is a comment
+    if line[:1] == b'.':
+        return line.decode("utf-8", "replace") if keep_source else None, None
+
+    label = line[:7].replace(b" ", b"").decode("utf-8", "replace")
+
+    marker = line[9:10]
+    mneumonic = line[10:16].replace(b" ", b"").decode("ascii", "replace")
+    addressing = line[18:19].decode("ascii", "replace")
+
+    operand = line[19:28].replace(b" ", b"").decode("utf-8", "replace")
+
+    symbols = []
+    if mneumonic in ["EXTDEF", "EXTREF", "COPY"]:
+        symbols = line[19:].decode("utf-8", "replace").split()
+
+    tokens = tokenize_operand(label, mneumonic, operand, symbols, marker == b"+", marker == b"*", addressing)
+    return line.decode("utf-8", "replace") if keep_source else None, tokens
+
+
+#
+#   Tokenize Operand Function
+#   completes the tokens of a line from its columns
+#
+#   Symbol lists of EXTDEF and EXTREF, and file names given to COPY, may run past the operand field, up to the
+#       first white space. Any other operand ending in ,X is indexed.
+#
+#   symbols - white space separated words from the operand field to the end of the line
+#
+def tokenize_operand(label, mneumonic, operand, symbols, extended, sic, addressing):
+    indexed = False
+    if mneumonic in ["EXTDEF", "EXTREF", "COPY"]:
+        operand = symbols[0] if len(symbols) > 0 else ""
+    elif ",X" in operand:
+        operand = operand.replace(",X", "")
+        indexed = True
+
+    return {
+        "label": label,
+        "mneumonic": mneumonic,
+        "operand": operand,
+        "indexed": indexed,
+        "extended": extended,
+        "sic": sic,
+        "addressing": addressing
+    }
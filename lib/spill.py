@@ -0,0 +1,232 @@
+#
+#
+#   Spill
+#   This module keeps lst records in temporary files, rather than in memory, between Pass 1, Pass 2 and the writers
+#
+#   As in a classic two pass assembler, Pass 1 writes an intermediate file which Pass 2 streams back. Pass 2 spills
+#       its own records the same way, and the lst and obj files are written by streaming those back. Memory used
+#       by the assembler stays flat no matter how long the program is.
+#
+#   Each lst record is packed into a fixed width binary record. Strings (line ids, source, labels, operands and
+#       object code) are written to a separate string pool, and records hold their offset and length in the pool.
+#       Mneumonics are only written to the pool once.
+#
+#   A Spill may be appended to and iterated over like the list of lst records it replaces, producing equal records.
+#
+#
+
+from lib import pass2, util
+import mmap
+import struct
+import tempfile
+
+# record types
+RECORD_LINE = 0
+RECORD_ERROR = 1
+
+# flag bits
+INDEXED = 1
+EXTENDED = 2
+SIC = 4
+WIDENED = 8
+OPERATION = 16
+
+# meta flags, as set by Pass 1
+FLAGS = [None, '-comm', '-notop', '-litch', '-lithx']
+
+# kinds of lines, as classified by Pass 2
+KINDS = [None] + list(pass2.handlers)
+
+# length of a string which is None
+NONE = 0xFFFFFFFF
+
+#   record type, flag bits, meta flag, kind, addressing, location,
+#   then an offset and length into the string pool for each of:
+#   line id, location (if not a number), source or error, object code, label, mneumonic, operand
+RECORD = struct.Struct("<BBBBBi" + "QI" * 7)
+
+# number of records read from the file at once
+CHUNK = 4096
+
+
+#
+#   Spill Class
+#   A list of lst records, kept in temporary files
+#
+class Spill:
+
+    def __init__(self, listing=True, directory=None):
+        self.listing = listing
+        self.records = tempfile.TemporaryFile(dir=directory)
+        self.pool = tempfile.TemporaryFile(dir=directory)
+        self.pool_size = 0
+        self.count = 0
+        self.interned = {}
+
+    def __len__(self):
+        return self.count
+
+    # Append Function
+    # packs an lst record, and writes it to the end of the file
+    #
+    def append(self, lst_item):
+        if 'Error' in lst_item:
+            self.records.write(RECORD.pack(
+                RECORD_ERROR, 0, 0, 0, 0, -1,
+                *self.write_string(lst_item['Line ID']), 0, 0, *self.write_string(lst_item['Error']),
+                0, 0, 0, 0, 0, 0, 0, 0))
+            self.count += 1
+            return
+
+        meta = lst_item['Meta']
+        bits = 0
+        if meta.get('indexed', False):
+            bits |= INDEXED
+        if meta.get('extended', False):
+            bits |= EXTENDED
+        if meta.get('sic', False):
+            bits |= SIC
+        if meta.get('widened', False):
+            bits |= WIDENED
+        if 'mneumonic' in meta:
+            bits |= OPERATION
+
+        location = self.location_value(lst_item['Location'])
+        addressing = meta.get('addressing', '')
+
+        self.records.write(RECORD.pack(
+            RECORD_LINE, bits, FLAGS.index(meta.get('flag', None)), KINDS.index(meta.get('kind', None)),
+            ord(addressing) if len(addressing) > 0 else 0, location,
+            *self.write_string(lst_item['Line ID']),
+            *self.write_string(lst_item['Location'] if location < 0 else ''),
+            *self.write_string(lst_item.get('Source', None)),
+            *self.write_string(lst_item['Object Code']),
+            *self.write_string(meta.get('label', None)),
+            *self.write_string(meta.get('mneumonic', None), True),
+            *self.write_string(meta.get('operand', None))))
+        self.count += 1
+
+    # Iterate Function
+    # unpacks each record, in the order they were appended
+    #
+    def __iter__(self):
+        self.records.flush()
+        self.pool.flush()
+        self.records.seek(0)
+
+        pool = b''
+        if self.pool_size > 0:
+            pool = mmap.mmap(self.pool.fileno(), 0, access=mmap.ACCESS_READ)
+
+        def read_string(offset, length):
+            if length == NONE:
+                return None
+            return pool[offset:offset + length].decode("utf-8")
+
+        try:
+            read = 0
+            while read < self.count:
+                chunk = self.records.read(RECORD.size * min(CHUNK, self.count - read))
+                for fields in RECORD.iter_unpack(chunk):
+                    read += 1
+                    line_id = read_string(fields[6], fields[7])
+
+                    if fields[0] == RECORD_ERROR:
+                        yield {
+                            'Line ID': line_id,
+                            'Error': read_string(fields[10], fields[11])
+                        }
+                        continue
+
+                    bits = fields[1]
+                    flag = FLAGS[fields[2]]
+                    kind = KINDS[fields[3]]
+
+                    if bits & OPERATION:
+                        mneumonic = read_string(fields[16], fields[17])
+                        meta = {
+                            "label": read_string(fields[14], fields[15]),
+                            "mneumonic": mneumonic,
+                            "operand": read_string(fields[18], fields[19]),
+                            "indexed": (bits & INDEXED) != 0,
+                            "extended": (bits & EXTENDED) != 0,
+                            "sic": (bits & SIC) != 0,
+                            "addressing": chr(fields[4]) if fields[4] else '',
+                            "operation": util.lookup_operation(mneumonic)
+                        }
+                        if bits & WIDENED:
+                            meta['widened'] = True
+                    else:
+                        meta = {}
+
+                    if flag is not None:
+                        meta['flag'] = flag
+                    if kind is not None:
+                        meta['kind'] = kind
+                        meta['handler'] = pass2.handlers[kind]
+
+                    if fields[5] >= 0:
+                        location = self.location_string(fields[5])
+                    else:
+                        location = read_string(fields[8], fields[9])
+
+                    lst_item = {
+                        'Line ID': line_id,
+                        'Location': location
+                    }
+                    if self.listing:
+                        lst_item['Source'] = read_string(fields[10], fields[11])
+                    lst_item['Object Code'] = read_string(fields[12], fields[13])
+                    lst_item['Meta'] = meta
+                    yield lst_item
+        finally:
+            if self.pool_size > 0:
+                pool.close()
+            self.records.seek(0, 2)
+
+    # Close Function
+    # removes the temporary files
+    #
+    def close(self):
+        self.records.close()
+        self.pool.close()
+
+    # Write String Function
+    # writes a string to the string pool, returning its offset and length
+    #
+    def write_string(self, string, intern=False):
+        if string is None:
+            return 0, NONE
+        if intern and string in self.interned:
+            return self.interned[string]
+
+        data = string.encode("utf-8")
+        reference = (self.pool_size, len(data))
+        if len(data) > 0:
+            self.pool.write(data)
+            self.pool_size += len(data)
+
+        if intern:
+            self.interned[string] = reference
+        return reference
+
+    # Location Value Function
+    # a location as a number, or -1 if the location is not a number formatted by util.add_lst_record
+    #
+    def location_value(self, location):
+        try:
+            value = int(location, 16)
+        except ValueError:
+            return -1
+
+        if value < 0 or self.location_string(value) != location:
+            return -1
+        return value
+
+    # Location String Function
+    # formats a location as util.add_lst_record does
+    #
+    def location_string(self, value):
+        if self.listing:
+            return hex(value)[2:].zfill(5).upper()
+        return hex(value)
@@ -0,0 +1,176 @@
+#
+#
+#   Symbol Database
+#   This module keeps the Symbol Table in an SQLite database on disk, rather than in memory, for very large programs
+#
+#   A SymbolDatabase may be used in place of the in-memory Symbol Table (see symbol_table.use_backend), with the same
+#       write_symbol, read_symbol, update_symbol, list_symbols and clear_symbols functions and responses.
+#
+#   Symbols written or updated are kept in a pending batch, which is written to the database in one transaction once
+#       it is full, or when flushed. Pass 1 flushes it after each LTORG or END literal pool, so the literals of a
+#       pool, and the labels before it, are inserted together. Symbols read are kept in a small LRU cache in front
+#       of the database.
+#
+#   Unlike the in-memory Symbol Table, the database is not limited to a number of symbols. The database is left on
+#       disk once the program is assembled, so the symbols of a program may be read by other tools.
+#
+#
+
+from collections import OrderedDict
+import sqlite3
+
+__author__ = 'Nicholas Pickering'
+
+# number of symbols kept in the LRU cache
+CACHE_SIZE = 1024
+
+# number of symbols written or updated before the pending batch is written to the database
+BATCH_SIZE = 4096
+
+
+#
+#   Symbol Database Class
+#   A Symbol Table kept in an SQLite database
+#
+class SymbolDatabase:
+
+    def __init__(self, filename):
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.execute("PRAGMA journal_mode = MEMORY")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS symbols (label TEXT PRIMARY KEY, value INTEGER) "
+                                "WITHOUT ROWID")
+        self.connection.commit()
+        self.pending = {}
+        self.cache = OrderedDict()
+
+    # Write Symbol Function
+    # inserts a label, or constant, failing if it is already in the database
+    #
+    def write_symbol(self, label, value):
+        if self.lookup(label) is not None:
+            return {
+                'success': False,
+                'message': 'Duplicate label found, ' + label
+            }
+
+        self.store(label, value)
+        return {
+            'success': True,
+            'message': None
+        }
+
+    # Read Symbol Function
+    # looks up a label, or constant, returning its tokens as the in-memory Symbol Table does
+    #
+    def read_symbol(self, label):
+        value = self.lookup(label)
+        if value is None:
+            return {
+                'success': False,
+                'message': "Operand not found in symbol table",
+                'tokens': None
+            }
+
+        return {
+            'success': True,
+            'message': "Operand found successfully",
+            'tokens': [label, format_value(value)]
+        }
+
+    # Update Symbol Function
+    # replaces the value of a label already in the database
+    #
+    def update_symbol(self, label, value):
+        if self.lookup(label) is None:
+            return {
+                'success': False,
+                'message': "Operand not found in symbol table"
+            }
+
+        self.store(label, value)
+        return {
+            'success': True,
+            'message': None
+        }
+
+    # List Symbols Function
+    # every label in the database along with its value, by label
+    #
+    def list_symbols(self):
+        self.flush()
+        return list(self.connection.execute("SELECT label, value FROM symbols ORDER BY label"))
+
+    # Clear Symbols Function
+    # empties the database, so another program may be assembled
+    #
+    def clear_symbols(self):
+        self.pending.clear()
+        self.cache.clear()
+        self.connection.execute("DELETE FROM symbols")
+        self.connection.commit()
+
+    # Flush Function
+    # writes the pending batch of symbols to the database, in one transaction
+    #
+    def flush(self):
+        if len(self.pending) == 0:
+            return
+
+        self.connection.executemany("INSERT OR REPLACE INTO symbols (label, value) VALUES (?, ?)",
+                                    self.pending.items())
+        self.connection.commit()
+        self.pending.clear()
+
+    # Close Function
+    # writes any pending symbols, and closes the database
+    #
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    # Lookup Function
+    # the value of a label, from the pending batch, the cache or the database, or None if it is not found
+    #
+    def lookup(self, label):
+        if label in self.pending:
+            return self.pending[label]
+
+        if label in self.cache:
+            self.cache.move_to_end(label)
+            return self.cache[label]
+
+        row = self.connection.execute("SELECT value FROM symbols WHERE label = ?", (label,)).fetchone()
+        if row is None:
+            return None
+
+        self.remember(label, row[0])
+        return row[0]
+
+    # Store Function
+    # adds a symbol to the pending batch, writing the batch once it is full
+    #
+    def store(self, label, value):
+        self.pending[label] = value
+        if label in self.cache:
+            self.remember(label, value)
+
+        if len(self.pending) >= BATCH_SIZE:
+            self.flush()
+
+    # Remember Function
+    # adds a symbol to the cache, dropping the least recently used symbol once the cache is full
+    #
+    def remember(self, label, value):
+        self.cache[label] = value
+        self.cache.move_to_end(label)
+        if len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+
+#
+#   Format Value Function
+#   formats a value as the in-memory Symbol Table stores it
+#
+def format_value(value):
+    return hex(value)[2:].upper().zfill(5)
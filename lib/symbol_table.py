@@ -6,6 +6,9 @@
 #   New Labels or constants are processed and stored according to their hash value
 #       (determined via the util.my_hash function)
 #
+#   The Symbol Table may instead be kept in another backend, such as a database on disk (see the symbol_database
+#       module), set with use_backend. Each function below is then passed on to the backend.
+#
 #
 #
 
@@ -17,6 +20,22 @@ hash_table_size = 50
 symbol_table = dict()
 SYMBOL_DEBUG = False
 
+# backend the Symbol Table is kept in, None while it is kept in symbol_table
+backend = None
+
+
+#
+# Use Backend Function
+# keeps the Symbol Table in a backend providing each function of this module, or in memory again if None
+#
+# Returns the backend which was in use.
+#
+def use_backend(new_backend):
+    global backend
+    old_backend = backend
+    backend = new_backend
+    return old_backend
+
 
 #
 # Write Symbol Function
@@ -29,6 +48,8 @@ SYMBOL_DEBUG = False
 #   to provide additional information about an error, or success.
 #
 def write_symbol(label, value):
+    if backend is not None:
+        return backend.write_symbol(label, value)
 
     # Produce a hash value from the token
     hash_value = util.my_hash(label, hash_table_size)
@@ -84,6 +105,8 @@ def write_symbol(label, value):
 # This function also returns the token in the symbol table.
 #
 def read_symbol(label):
+    if backend is not None:
+        return backend.read_symbol(label)
 
     # Produce a hash value from the token
     hash_value = util.my_hash(label, hash_table_size)
@@ -133,12 +156,36 @@ def read_symbol(label):
 
     return response
 
+#
+# Clear Symbols Function
+# empties the Symbol Table, so another program may be assembled
+#
+def clear_symbols():
+    if backend is not None:
+        backend.clear_symbols()
+    symbol_table.clear()
+
+
+#
+# Flush Symbols Function
+# writes any symbols the backend holds back in a batch, Pass 1 calls it after each literal pool
+#
+def flush_symbols():
+    if backend is not None:
+        backend.flush()
+
+
 #
 # Print Symbols Function
 # quick and dirty dump of Symbol Table
 #
 def print_symbols():
     print("Printing Symbol Table...")
+    if backend is not None:
+        for label, value in backend.list_symbols():
+            print(label + "\t" + hex(value)[2:].upper().zfill(5))
+        return
+
     symbol_table_sorted = sorted(symbol_table)
     for symbol in symbol_table_sorted:
         symbol_tokens = symbol_table[symbol].split()
@@ -147,4 +194,61 @@ def print_symbols():
         if len(symbol_tokens[0]) < 8:
             extra_tab = "\t"
 
-        print(str(symbol) + "\t" + symbol_tokens[0] + "\t" + extra_tab + symbol_tokens[1])
\ No newline at end of file
+        print(str(symbol) + "\t" + symbol_tokens[0] + "\t" + extra_tab + symbol_tokens[1])
+
+#
+# Update Symbol Function
+# replace the memory address stored against a label already in the Symbol Table
+#
+# label - label, or identifier, to update
+# value - new memory address location to be stored against label
+#
+# This function may return True or False to denote success and failure, along with a message
+#   to provide additional information about an error, or success.
+#
+def update_symbol(label, value):
+    if backend is not None:
+        return backend.update_symbol(label, value)
+
+    # Produce a hash value from the token
+    hash_value = util.my_hash(label, hash_table_size)
+    initial_hash_value = hash_value
+
+    # Walk the probe sequence used by write_symbol until the label is found
+    while hash_value in symbol_table.keys():
+        if symbol_table[hash_value].split()[0] == label:
+            symbol_table[hash_value] = label + " " + hex(value)[2:].upper().zfill(5)
+            return {
+                'success': True,
+                'message': None
+            }
+
+        # Adjust linearly for collision detected
+        if hash_value != hash_table_size-1:
+            hash_value += 1
+        else:
+            hash_value = 0
+
+        if hash_value == initial_hash_value:
+            break
+
+    return {
+        'success': False,
+        'message': "Operand not found in symbol table"
+    }
+
+
+#
+# List Symbols Function
+# returns every label in the Symbol Table along with its memory address as an integer
+#
+def list_symbols():
+    if backend is not None:
+        return backend.list_symbols()
+
+    symbols = []
+    for hash_value in sorted(symbol_table):
+        symbol_tokens = symbol_table[hash_value].split()
+        symbols.append((symbol_tokens[0], int(symbol_tokens[1], 16)))
+
+    return symbols
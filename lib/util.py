@@ -27,12 +27,18 @@ def my_hash(input_string, hash_table_size):
 #
 # mneumonic - the label of the operation, used to define it
 def lookup_operation(mneumonic):
+    return Operation.operation_table.get(mneumonic, None)
 
-    if len(Operation.operation_table) <= 0:
-        Operation.load_operation_table()
 
-    if mneumonic in Operation.operation_table.keys():
-        return Operation.operation_table[mneumonic]
+# Lookup Opcode Function
+# Returns a whole Operation object based on the first byte of its object code
+#
+# The last two bits of the first byte hold the n and i flags of format 3/4 operations, so operations are
+#   indexed by the top six bits of their opcode
+#
+# opcode - the first byte of an operation's object code, as an integer
+def lookup_opcode(opcode):
+    return Operation.opcode_table.get(opcode & 0xFC, None)
 
 
 # Lookup Register Function
@@ -71,96 +77,107 @@ def lookup_register(register):
 #
 class Operation:
 
-    operation_table = dict()
-
     def __init__(self, name, format_list, opcode):
         self.name = name
         self.format_list = format_list
         self.opcode = opcode
 
-    # Load Operation Table Function
-    # loads all Operations into memory for lookup
-    #
-    @staticmethod
-    def load_operation_table():
-
-        # typical operations with assembled code
-        Operation.operation_table['ADD'] = (Operation('ADD', [3, 4], '18'))
-        Operation.operation_table['ADDF'] = (Operation('ADDF', [3, 4], '58'))
-        Operation.operation_table['ADDR'] = (Operation('ADDR', [2], '90'))
-        Operation.operation_table['AND'] = (Operation('AND', [3, 4], '40'))
-        Operation.operation_table['CLEAR'] = (Operation('CLEAR', [2], 'B4'))
-        Operation.operation_table['COMP'] = (Operation('COMP', [3, 4], '28'))
-        Operation.operation_table['COMPF'] = (Operation('COMPF', [3, 4], '88'))
-        Operation.operation_table['COMPR'] = (Operation('COMPR', [2], 'A0'))
-        Operation.operation_table['DIV'] = (Operation('DIV', [3, 4], '24'))
-        Operation.operation_table['DIVF'] = (Operation('DIVF', [3, 4], '64'))
-        Operation.operation_table['DIVR'] = (Operation('DIVR', [2], '9C'))
-        Operation.operation_table['FIX'] = (Operation('FIX', [1], 'C4'))
-        Operation.operation_table['FLOAT'] = (Operation('FLOAT', [1], 'C0'))
-        Operation.operation_table['HIO'] = (Operation('HIO', [1], 'F4'))
-        Operation.operation_table['J'] = (Operation('J', [3, 4], '3C'))
-        Operation.operation_table['JEQ'] = (Operation('JEQ', [3, 4], '30'))
-        Operation.operation_table['JGT'] = (Operation('JGT', [3, 4], '34'))
-        Operation.operation_table['JLT'] = (Operation('JLT', [3, 4], '38'))
-        Operation.operation_table['JSUB'] = (Operation('JSUB', [3, 4], '48'))
-        Operation.operation_table['LDA'] = (Operation('LDA', [3, 4], '00'))
-        Operation.operation_table['LDB'] = (Operation('LDB', [3, 4], '68'))
-        Operation.operation_table['LDCH'] = (Operation('LDCH', [3, 4], '50'))
-        Operation.operation_table['LDF'] = (Operation('LDL', [3, 4], '70'))
-        Operation.operation_table['LDL'] = (Operation('LDL', [3, 4], '08'))
-        Operation.operation_table['LDS'] = (Operation('LDS', [3, 4], '6C'))
-        Operation.operation_table['LDT'] = (Operation('LDT', [3, 4], '74'))
-        Operation.operation_table['LDX'] = (Operation('LDX', [3, 4], '04'))
-        Operation.operation_table['LPS'] = (Operation('LPS', [3, 4], 'D0'))
-        Operation.operation_table['MUL'] = (Operation('MUL', [3, 4], '20'))
-        Operation.operation_table['MULF'] = (Operation('MULF', [3, 4], '60'))
-        Operation.operation_table['MULR'] = (Operation('MULR', [2], '98'))
-        Operation.operation_table['NORM'] = (Operation('NORM', [1], 'C8'))
-        Operation.operation_table['OR'] = (Operation('OR', [3, 4], '44'))
-        Operation.operation_table['RD'] = (Operation('RD', [3, 4], 'D8'))
-        Operation.operation_table['RMO'] = (Operation('RMO', [2], 'AC'))
-        Operation.operation_table['RSUB'] = (Operation('RSUB', [3, 4], '4C'))
-        Operation.operation_table['SHIFTL'] = (Operation('SHIFTL', [2], 'A4'))
-        Operation.operation_table['SHIFTR'] = (Operation('SHIFTR', [2], 'A8'))
-        Operation.operation_table['SIO'] = (Operation('SIO', [1], 'F0'))
-        Operation.operation_table['SSK'] = (Operation('SSK', [3, 4], 'EC'))
-        Operation.operation_table['STA'] = (Operation('STA', [3, 4], '0C'))
-        Operation.operation_table['STB'] = (Operation('STB', [3, 4], '78'))
-        Operation.operation_table['STCH'] = (Operation('STCH', [3, 4], '54'))
-        Operation.operation_table['STF'] = (Operation('STF', [3, 4], '80'))
-        Operation.operation_table['STI'] = (Operation('STI', [3, 4], 'D4'))
-        Operation.operation_table['STL'] = (Operation('STL', [3, 4], '14'))
-        Operation.operation_table['STS'] = (Operation('STS', [3, 4], '7C'))
-        Operation.operation_table['STSW'] = (Operation('STSW', [3, 4], 'E8'))
-        Operation.operation_table['STT'] = (Operation('STT', [3, 4], '84'))
-        Operation.operation_table['STX'] = (Operation('STX', [3, 4], '10'))
-        Operation.operation_table['SUB'] = (Operation('SUB', [3, 4], '1C'))
-        Operation.operation_table['SUBF'] = (Operation('SUBF', [3, 4], '5C'))
-        Operation.operation_table['SUBR'] = (Operation('SUBR', [2], '94'))
-        Operation.operation_table['TD'] = (Operation('TD', [3, 4], 'E0'))
-        Operation.operation_table['TIO'] = (Operation('TIO', [1], 'F8'))
-        Operation.operation_table['TIX'] = (Operation('TIX', [3, 4], '2C'))
-        Operation.operation_table['TIXR'] = (Operation('TIXR', [2], 'B8'))
-        Operation.operation_table['WD'] = (Operation('WD', [3, 4], 'DC'))
-
-        # operations with assembled code but no opcodes
-        Operation.operation_table['BYTE'] = (Operation('BYTE', [], 'FF'))
-        Operation.operation_table['WORD'] = (Operation('WORD', [3], 'FF'))
-        Operation.operation_table['RESW'] = (Operation('RESW', [], 'FF'))
-        Operation.operation_table['RESB'] = (Operation('RESB', [], 'FF'))
-
-        # operations with no assembled codes
-        Operation.operation_table['START'] = (Operation('START', [], None))
-        Operation.operation_table['END'] = (Operation('END', [], None))
-        Operation.operation_table['BASE'] = (Operation('BASE', [], None))
-        Operation.operation_table['NOBASE'] = (Operation('NOBASE', [], None))
-        Operation.operation_table['LTORG'] = (Operation('LTORG', [], None))
-
     def __str__(self):
         return self.name + " " + str(self.opcode) + "\n"
 
 
+# Operations
+# every operation, by mneumonic, as its format list and opcode
+#
+#   Kept as literal data, the lookup tables of Operation objects are built from it as the module is imported, so
+#       there is no setup on the first lookup
+#
+OPERATIONS = {
+
+    # typical operations with assembled code
+    'ADD': ([3, 4], '18'),
+    'ADDF': ([3, 4], '58'),
+    'ADDR': ([2], '90'),
+    'AND': ([3, 4], '40'),
+    'CLEAR': ([2], 'B4'),
+    'COMP': ([3, 4], '28'),
+    'COMPF': ([3, 4], '88'),
+    'COMPR': ([2], 'A0'),
+    'DIV': ([3, 4], '24'),
+    'DIVF': ([3, 4], '64'),
+    'DIVR': ([2], '9C'),
+    'FIX': ([1], 'C4'),
+    'FLOAT': ([1], 'C0'),
+    'HIO': ([1], 'F4'),
+    'J': ([3, 4], '3C'),
+    'JEQ': ([3, 4], '30'),
+    'JGT': ([3, 4], '34'),
+    'JLT': ([3, 4], '38'),
+    'JSUB': ([3, 4], '48'),
+    'LDA': ([3, 4], '00'),
+    'LDB': ([3, 4], '68'),
+    'LDCH': ([3, 4], '50'),
+    'LDF': ([3, 4], '70'),
+    'LDL': ([3, 4], '08'),
+    'LDS': ([3, 4], '6C'),
+    'LDT': ([3, 4], '74'),
+    'LDX': ([3, 4], '04'),
+    'LPS': ([3, 4], 'D0'),
+    'MUL': ([3, 4], '20'),
+    'MULF': ([3, 4], '60'),
+    'MULR': ([2], '98'),
+    'NORM': ([1], 'C8'),
+    'OR': ([3, 4], '44'),
+    'RD': ([3, 4], 'D8'),
+    'RMO': ([2], 'AC'),
+    'RSUB': ([3, 4], '4C'),
+    'SHIFTL': ([2], 'A4'),
+    'SHIFTR': ([2], 'A8'),
+    'SIO': ([1], 'F0'),
+    'SSK': ([3, 4], 'EC'),
+    'STA': ([3, 4], '0C'),
+    'STB': ([3, 4], '78'),
+    'STCH': ([3, 4], '54'),
+    'STF': ([3, 4], '80'),
+    'STI': ([3, 4], 'D4'),
+    'STL': ([3, 4], '14'),
+    'STS': ([3, 4], '7C'),
+    'STSW': ([3, 4], 'E8'),
+    'STT': ([3, 4], '84'),
+    'STX': ([3, 4], '10'),
+    'SUB': ([3, 4], '1C'),
+    'SUBF': ([3, 4], '5C'),
+    'SUBR': ([2], '94'),
+    'TD': ([3, 4], 'E0'),
+    'TIO': ([1], 'F8'),
+    'TIX': ([3, 4], '2C'),
+    'TIXR': ([2], 'B8'),
+    'WD': ([3, 4], 'DC'),
+
+    # operations with assembled code but no opcodes
+    'BYTE': ([], 'FF'),
+    'WORD': ([3], 'FF'),
+    'RESW': ([], 'FF'),
+    'RESB': ([], 'FF'),
+
+    # operations with no assembled codes
+    'START': ([], None),
+    'END': ([], None),
+    'BASE': ([], None),
+    'NOBASE': ([], None),
+    'LTORG': ([], None),
+    'EXTDEF': ([], None),
+    'EXTREF': ([], None),
+    'COPY': ([], None),
+}
+
+Operation.operation_table = dict((name, Operation(name, format_list, opcode))
+                                 for name, (format_list, opcode) in OPERATIONS.items())
+Operation.opcode_table = dict((int(operation.opcode, 16) & 0xFC, operation)
+                              for operation in Operation.operation_table.values()
+                              if operation.opcode is not None and operation.opcode != 'FF')
+
+
 #   Error
 #   Print Error Message to Screen
 #
@@ -182,8 +199,19 @@ def error(message, do_exit=False):
 #   source - the initial source which the line item was generated
 #   object_code - the assembled object code for the instruction
 #   meta - list which includes various information about the line item useful for assembling the object code in Pass 2
-#   lst - list to add the record to
-def add_lst_record(line_id, location, object_code, source, meta, lst):
+#   lst - list to add the record to, or a Spill
+#   listing - if not set, the record is only used to generate the obj file, so the source is dropped and the
+#       line id and location are kept as given
+def add_lst_record(line_id, location, object_code, source, meta, lst, listing=True):
+    if not listing:
+        lst.append({
+            'Line ID': line_id,
+            'Location': location,
+            'Object Code': object_code,
+            'Meta': meta
+        })
+        return
+
     lst.append({
         'Line ID': str(line_id).zfill(3),
         'Location': str(location[2:]).zfill(5).upper(),
@@ -198,7 +226,7 @@ def add_lst_record(line_id, location, object_code, source, meta, lst):
 #
 #   line_id - line number in the lst record, will match the Line ID in order to pair error with line item
 #   message - error message to write to lst file
-#   lst - list to add the record to
+#   lst - list to add the record to, or a Spill
 #   inject - an optional position(integer) to inject the error message into the lst file, useful during Pass 2
 def add_lst_error(line_id, message, lst, inject=False):
     record = {
@@ -207,11 +235,12 @@ def add_lst_error(line_id, message, lst, inject=False):
     }
 
     # If a line has an error, scrap any object code generated for it
-    error_found = False
-    for lst_record in lst:
-        if lst_record['Line ID'] == line_id:
-            if 'Error' not in lst_record:
-                lst_record['Object Code'] = '    '
+    # records already spilled to a file (see the spill module) are not scanned, their object code is not written
+    if isinstance(lst, list):
+        for lst_record in lst:
+            if lst_record['Line ID'] == line_id:
+                if 'Error' not in lst_record:
+                    lst_record['Object Code'] = '    '
 
     if not inject:
         lst.append(record)
@@ -232,4 +261,12 @@ def hexized(operand, size):
         return format_string % (int(operand) & 0xfff)
     if size == 6:
         format_string = "%06x"
-        return format_string % (int(operand) & 0xffffff)
\ No newline at end of file
+        return format_string % (int(operand) & 0xffffff)
+
+#
+#   Is Number Function
+#   Determines whether an operand is a decimal constant, rather than a symbol
+#
+#   operand - operand to check, may be signed
+def is_number(operand):
+    return operand.lstrip('+-').isdigit()
@@ -0,0 +1,77 @@
+#
+#
+#   Watch
+#   This module watches programs for changes, reassembling them as soon as they are saved
+#
+#   Watching runs in a single long-lived process, so the operation table (and any worker processes) stay loaded
+#       between builds, rather than being loaded again for every build.
+#
+#   Files are polled by modification time and size, which only costs a stat per file each interval. A program is
+#       reassembled when it, or any file it includes with COPY, changes. Bursts of saves are debounced, so a
+#       program is only reassembled once its files have stopped changing.
+#
+#
+
+import os
+import time
+
+
+#
+#   Stamp Function
+#   identifies the current version of a file by its modification time and size, None if the file is missing
+#
+def stamp(filename):
+    try:
+        status = os.stat(filename)
+    except OSError:
+        return None
+    return status.st_mtime_ns, status.st_size
+
+
+#
+#   Watch Function
+#   assembles programs, then reassembles them whenever their files change, until interrupted
+#
+#   filenames - source files to watch
+#   rebuild - function called with the list of sources to assemble, returning their results. Each result holds the
+#       'filename' of a source and the files it 'included', which are watched along with it.
+#   interval - time between polls, in seconds
+#   debounce - time a changed file must be left unchanged before it is reassembled, in seconds
+#
+def watch(filenames, rebuild, interval=0.05, debounce=0.1):
+    dependencies = {}
+
+    def build(sources):
+        for result in rebuild(sources):
+            dependencies[result['filename']] = [result['filename']] + list(result.get('included', None) or [])
+
+            # files included for the first time are only watched from now on
+            for filename in dependencies[result['filename']]:
+                if filename not in stamps:
+                    stamps[filename] = stamp(filename)
+
+    # stamps are taken before building, so saves made while building are picked up by the next poll
+    stamps = {filename: stamp(filename) for filename in filenames}
+    build(filenames)
+
+    while True:
+        time.sleep(interval)
+
+        watched = set(filename for files in dependencies.values() for filename in files)
+        changed = set(filename for filename in watched if stamp(filename) != stamps.get(filename, None))
+        if len(changed) == 0:
+            continue
+
+        # wait for the files to settle, any further save restarts the wait
+        settled_since = time.perf_counter()
+        current = {filename: stamp(filename) for filename in watched}
+        while time.perf_counter() - settled_since < debounce:
+            time.sleep(interval)
+            latest = {filename: stamp(filename) for filename in watched}
+            if latest != current:
+                changed.update(filename for filename in watched if latest[filename] != current[filename])
+                current = latest
+                settled_since = time.perf_counter()
+
+        stamps.update(current)
+        build([source for source in filenames if any(filename in changed for filename in dependencies[source])])
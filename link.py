@@ -0,0 +1,57 @@
+#
+#
+#   Link
+#   This module acts as the starting point for the linker
+#
+#   The linker combines several obj files, each assembled separately by the assembler, into a single obj file.
+#   Programs share symbols by exporting them with EXTDEF and importing them with EXTREF.
+#
+#   Each obj file must be accompanied by the lnk file the assembler writes alongside it.
+#
+#
+from lib import util, linker, objfile
+
+__author__ = 'Nicholas Pickering'
+
+import argparse
+
+#   Start Main Program
+print("SIC/XE Linker 3000")
+print("Written by Nicholas Pickering")
+
+#   Read in options and files for processing...
+parser = argparse.ArgumentParser(description="SIC/XE Linker 3000")
+parser.add_argument("filenames", nargs="+", help="obj files to link, the first provides the start address")
+parser.add_argument("-o", "--output", default="a.obj", help="linked obj file to write, defaults to a.obj")
+parser.add_argument("-a", "--address", default=None, help="memory location, in hex, to load the first obj file")
+options = parser.parse_args()
+
+load_address = None
+if options.address is not None:
+    load_address = int(options.address, 16)
+
+modules = []
+for filename in options.filenames:
+    try:
+        modules.append(linker.read_module(filename))
+    except (IOError, ValueError) as e:
+        util.error("Could not read " + filename + ": " + str(e) + "... Exiting...", True)
+
+#
+#   Link Modules
+#   Resolve symbols between modules and relocate them into a single program
+#
+link_result = linker.link(modules, load_address)
+
+if link_result['success'] is False:
+    for message in link_result['errors']:
+        util.error(message)
+    util.error("Errors (link): No object file generated.", True)
+
+with open(options.output, "w") as obj_file:
+    objfile.write_object(obj_file, link_result['sections'], link_result['start'])
+
+print("LOAD MAP")
+for name, address, length in link_result['map']:
+    print(name.ljust(8) + "\t" + util.hexized(address, 6).upper() + "\t" + util.hexized(length, 6).upper())
+print("Linked object file: " + options.output)
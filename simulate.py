@@ -0,0 +1,69 @@
+#
+#
+#   Simulate
+#   This module acts as the starting point for the simulator
+#
+#   The simulator loads an obj file written by the assembler, or a raw memory image, and executes it.
+#   The program ends when it jumps to itself, returns with RSUB from the start of the program, or after a
+#       maximum number of operations.
+#
+#   After execution, the registers and the rate of execution in instructions per second are reported.
+#   The simulator exits with an error if the program did not end normally.
+#
+#
+from lib import util, simulator
+
+__author__ = 'Nicholas Pickering'
+
+import argparse
+import sys
+
+#   Start Main Program
+print("SIC/XE Simulator 3000")
+print("Written by Nicholas Pickering")
+
+#   Read in options and file for processing...
+parser = argparse.ArgumentParser(description="SIC/XE Simulator 3000")
+parser.add_argument("filename", help="obj file written by the assembler, or a raw memory image")
+parser.add_argument("-r", "--raw", action="store_true", help="treat the file as a raw memory image")
+parser.add_argument("-a", "--address", default="0", help="memory location, in hex, to load a raw memory image")
+parser.add_argument("-m", "--max-steps", type=int, default=1000000,
+                    help="number of operations to execute before stopping, defaults to 1000000")
+parser.add_argument("-i", "--input", default=None, help="file supplying the bytes read by RD operations")
+options = parser.parse_args()
+
+sim = simulator.Simulator()
+
+try:
+    if options.raw or not options.filename.endswith(".obj"):
+        with open(options.filename, "rb") as image_file:
+            sim.load_image(image_file.read(), int(options.address, 16))
+    else:
+        with open(options.filename, "r") as obj_file:
+            sim.load_object(obj_file)
+
+    if options.input is not None:
+        with open(options.input, "rb") as input_file:
+            sim.input = input_file.read()
+except (IOError, ValueError) as e:
+    util.error("Could not load " + options.filename + ": " + str(e) + "... Exiting...", True)
+
+#
+#   Execute Program
+#
+result = sim.run(options.max_steps)
+
+print(result['message'])
+print("Registers:")
+for register in ['A', 'X', 'L', 'B', 'S', 'T', 'PC', 'SW']:
+    value = sim.registers[int(util.lookup_register(register))]
+    print("    " + register.ljust(2) + "\t" + util.hexized(value, 6).upper())
+
+for device, data in sorted(sim.output.items()):
+    print("Device " + hex(device)[2:].upper().zfill(2) + " output: " + data.decode('ascii', 'replace'))
+
+print("Executed " + str(result['steps']) + " operations in " + "%.3f" % result['elapsed'] + " seconds (" +
+      "%.0f" % result['ips'] + " instructions per second)")
+
+if not result['success']:
+    sys.exit(1)